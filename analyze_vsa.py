@@ -1,15 +1,34 @@
 import json
 import os
 import logging
-import google.generativeai as genai
 import time
-import yfinance as yf
+from concurrent.futures import ThreadPoolExecutor
+
+import llm_clients
+
+# google.generativeai, yfinance and vsa_utils (pandas) are imported only on the paths that use them:
+# passthrough runs never load the Gemini SDK and empty runs load nothing heavy.
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 INPUT_FILE = 'filtered_tickers.json'
 OUTPUT_FILE = 'vsa_results.json'
+# Same results, one JSON object per line, so the report can stream them
+OUTPUT_JSONL = 'vsa_results.jsonl'
+
+# Pre-ranking: only the top-N setups scoring at least LLM_MIN_SCORE are sent to Gemini.
+# Everything else goes through the passthrough path (algo signals only).
+LLM_MAX_TICKERS = int(os.environ.get("VSA_LLM_MAX_TICKERS", "100"))
+LLM_MIN_SCORE = float(os.environ.get("VSA_LLM_MIN_SCORE", "8"))
+
+# LLM batching: tickers per prompt, batches in flight, pause before each further batch,
+# and retries on 429 (waits 4/3, 7/3, 10/3... x LLM_RETRY_DELAY: 40s, 70s, 100s by default)
+LLM_BATCH_SIZE = int(os.environ.get("VSA_LLM_BATCH_SIZE", "50"))
+LLM_CONCURRENCY = int(os.environ.get("VSA_LLM_CONCURRENCY", "1"))
+LLM_BATCH_PAUSE = float(os.environ.get("VSA_LLM_BATCH_PAUSE", "15"))
+LLM_MAX_RETRIES = int(os.environ.get("VSA_LLM_MAX_RETRIES", "5"))
+LLM_RETRY_DELAY = float(os.environ.get("VSA_LLM_RETRY_DELAY", "30"))
 
 def load_filtered_tickers():
     if not os.path.exists(INPUT_FILE):
@@ -20,14 +39,16 @@ def load_filtered_tickers():
 def get_market_context():
     """Calculates SPY context: Trend (SMA20 vs SMA50) and Last Bar VSA."""
     try:
+        import yfinance as yf
         spy = yf.Ticker("SPY")
         history = spy.history(period="1y", interval="1d")
         if len(history) < 50:
              return "Market Context: Data Unavailable"
         
-        # Calculate Trend
-        sma20 = history['Close'].rolling(20).mean().iloc[-1]
-        sma50 = history['Close'].rolling(50).mean().iloc[-1]
+        # Calculate Trend (both SMAs from one cumulative-sum pass)
+        import vsa_utils
+        smas = vsa_utils.rolling_means(history['Close'], (20, 50))
+        sma20, sma50 = smas[20][-1], smas[50][-1]
         
         trend = "BULLISH" if sma20 > sma50 else "BEARISH"
         if abs(sma20 - sma50) / sma50 < 0.01:
@@ -43,10 +64,19 @@ def get_market_context():
         logging.warning(f"Failed to fetch market context: {e}")
         return "Market Context: Data Unavailable"
 
-def analyze_batch(model_id, batch_data, market_context):
-    api_key = os.environ.get("GEMINI_API_KEY")
-    genai.configure(api_key=api_key)
-    
+def format_sequences(sequences):
+    """Compact one-line form of scan_vsa_sequences output, e.g. '2026-01-05 STOPPING_VOLUME CONFIRMED_EARLY (T1 2026-01-12)'."""
+    if not sequences:
+        return "None"
+    parts = []
+    for seq in sequences:
+        tests = [d for d in (seq.get('test1_date'), seq.get('test2_date')) if d]
+        test_str = f" (T{', T'.join(f'{n} {d}' for n, d in enumerate(tests, 1))})" if tests else ""
+        parts.append(f"{seq['anchor_date']} {seq['type']} {seq['status']}{test_str}")
+    return "; ".join(parts)
+
+def analyze_batch(client, batch_data, market_context):
+    """Sends one batch prompt through an llm_clients client; returns the parsed list of per-ticker results."""
     # Construct prompt for multiple tickers
     system_instruction = """
     Act as a Master Volume Spread Analysis (VSA) Expert. 
@@ -79,6 +109,8 @@ def analyze_batch(model_id, batch_data, market_context):
         m_sig = data.get('monthly_signal', {})
         batch_prompt_content += f"Weekly Sequence: {w_sig.get('type')} ({w_sig.get('status')})\n"
         batch_prompt_content += f"Monthly Sequence: {m_sig.get('type')} ({m_sig.get('status')})\n"
+        batch_prompt_content += f"Weekly Sequence History: {format_sequences(data.get('weekly_sequences'))}\n"
+        batch_prompt_content += f"Monthly Sequence History: {format_sequences(data.get('monthly_sequences'))}\n"
         
         # Only take last 5 weekly and 3 monthly to save tokens, focusing on recent behavior
         weekly_subset = dict(list(data.get('weekly_data', {}).items())[-5:])
@@ -86,16 +118,9 @@ def analyze_batch(model_id, batch_data, market_context):
         batch_prompt_content += f"Weekly (last 5): {json.dumps(weekly_subset)}\n"
         batch_prompt_content += f"Monthly (last 3): {json.dumps(monthly_subset)}\n"
 
-    max_retries = 5
-    base_delay = 30
-    
-    for attempt in range(max_retries):
+    for attempt in range(LLM_MAX_RETRIES):
         try:
-            model = genai.GenerativeModel(model_id)
-            response = model.generate_content(
-                system_instruction + "\n\n" + batch_prompt_content
-            )
-            text = response.text
+            text = client.generate(system_instruction + "\n\n" + batch_prompt_content)
             text = text.replace("```json", "").replace("```", "").strip()
             
             # Ensure it's a list
@@ -107,7 +132,7 @@ def analyze_batch(model_id, batch_data, market_context):
         except Exception as e:
             error_str = str(e)
             if "429" in error_str or "RESOURCE_EXHAUSTED" in error_str:
-                wait_time = base_delay * (attempt + 1) + 10
+                wait_time = LLM_RETRY_DELAY * (attempt + 1) + LLM_RETRY_DELAY / 3
                 logging.warning(f"Rate limit hit. Retrying in {wait_time}s...")
                 time.sleep(wait_time)
                 continue
@@ -117,88 +142,146 @@ def analyze_batch(model_id, batch_data, market_context):
 
     return []
 
-def run_analysis():
-    tickers_data = load_filtered_tickers()
+def build_passthrough_result(data, score=None, levels=None):
+    """Builds a result from the algorithmic signals only (no LLM call), with rule-based levels if given."""
+    # Copy all data
+    res = data.copy()
+    # Determine Verdict based on signal type
+    w_type = data.get('weekly_signal', {}).get('type', 'NONE')
+    if 'STOPPING' in w_type or 'TEST' in w_type:
+        res['verdict'] = "BULLISH_SETUP"
+    elif 'CLIMAX' in w_type or 'DOMINANCE' in w_type:
+        res['verdict'] = "BEARISH_SETUP"
+    else:
+        res['verdict'] = "NEUTRAL"
+        
+    res['vsa_status'] = data.get('reason', 'Signal Detected')
+    if levels:
+        res.update(levels)
+    if score is not None:
+        res['score'] = score
+    return res
+
+def select_for_llm(scores):
+    """Returns the tickers worth an LLM call: score >= LLM_MIN_SCORE, capped at LLM_MAX_TICKERS (best first)."""
+    selected = scores[scores >= LLM_MIN_SCORE]
+    return selected.index[:LLM_MAX_TICKERS].tolist()
+
+def analyze_with_llm(client, ticker_list, tickers_data, market_context):
+    """
+    Runs the tickers through the LLM in batches of LLM_BATCH_SIZE, LLM_CONCURRENCY batches at a time.
+    Returns {ticker: LLM result} for the tickers the LLM answered (hallucinated tickers are dropped).
+    """
+    batches = [ticker_list[i:i + LLM_BATCH_SIZE] for i in range(0, len(ticker_list), LLM_BATCH_SIZE)]
+
+    def run_batch(index):
+        batch_keys = batches[index]
+        if index >= LLM_CONCURRENCY:
+            time.sleep(LLM_BATCH_PAUSE) # Buffer between batches
+        logging.info(f"Processing batch {index + 1}/{len(batches)}: {batch_keys}")
+        return batch_keys, analyze_batch(client, {k: tickers_data[k] for k in batch_keys}, market_context)
+
+    answers = {}
+    with ThreadPoolExecutor(max_workers=max(1, LLM_CONCURRENCY)) as executor:
+        for batch_keys, batch_results in executor.map(run_batch, range(len(batches))):
+            if not isinstance(batch_results, list):
+                continue
+            for res in batch_results:
+                ticker = res.get('ticker') if isinstance(res, dict) else None
+                if not ticker:
+                    continue
+                if ticker not in batch_keys:
+                    logging.warning(f"LLM hallucinated ticker {ticker} not in batch {batch_keys}")
+                else:
+                    answers[ticker] = res
+    return answers
+
+def save_results(results):
+    """Writes OUTPUT_FILE and its line-per-ticker twin OUTPUT_JSONL (written last, so it is never older)."""
+    with open(OUTPUT_FILE, 'w') as f:
+        json.dump(results, f, indent=4)
+    with open(OUTPUT_JSONL, 'w') as f:
+        for ticker, data in results.items():
+            f.write(json.dumps({'ticker': ticker, **data}) + "\n")
+
+def run_analysis(tickers_data=None):
+    """Analyzes the filtered tickers (read from INPUT_FILE unless passed in) and writes OUTPUT_FILE."""
+    return analyze_tickers(tickers_data)[0]
+
+def analyze_tickers(tickers_data=None):
+    """
+    run_analysis, also reporting whether the analysis is complete: (results, complete).
+    It is incomplete when the LLM client could not be set up or the LLM did not answer every
+    ticker sent to it (rate limits, malformed responses); run_pipeline does not cache those.
+    """
+    if tickers_data is None:
+        tickers_data = load_filtered_tickers()
     if not tickers_data:
         logging.info("No tickers to analyze.")
-        return
+        return {}, True
 
-    api_key = os.environ.get("GEMINI_API_KEY")
-    
-    # Passthrough Mode if API Key is missing
-    if not api_key:
-        logging.warning("GEMINI_API_KEY not set. Running in PASSTHROUGH MODE (Algo signals only).")
-        results = {}
-        for ticker, data in tickers_data.items():
-            # Copy all data
-            res = data.copy()
-            # Determine Verdict based on signal type
-            w_type = data.get('weekly_signal', {}).get('type', 'NONE')
-            if 'STOPPING' in w_type or 'TEST' in w_type:
-                res['verdict'] = "BULLISH_SETUP"
-            elif 'CLIMAX' in w_type or 'DOMINANCE' in w_type:
-                res['verdict'] = "BEARISH_SETUP"
-            else:
-                res['verdict'] = "NEUTRAL"
-                
-            res['vsa_status'] = data.get('reason', 'Signal Detected')
-            results[ticker] = res
-            
-        with open(OUTPUT_FILE, 'w') as f:
-            json.dump(results, f, indent=4)
-        logging.info(f"Passthrough complete. Saved {len(results)} results to {OUTPUT_FILE}")
-        return
+    import vsa_utils
+
+    scores = vsa_utils.score_setups(tickers_data)['score']
+    # Rule-based trigger/invalidation/key levels for every ticker the LLM does not cover
+    levels = vsa_utils.derive_trade_levels(tickers_data).to_dict(orient='index')
 
+    # Passthrough Mode if API Key is missing (the fake backend needs none)
     try:
-        genai.configure(api_key=api_key)
+        client = llm_clients.get_client()
     except Exception as e:
         logging.error(f"Configuration failed: {e}")
-        return
+        return {}, False
+    if client is None:
+        logging.warning("GEMINI_API_KEY not set. Running in PASSTHROUGH MODE (Algo signals only).")
+        results = {ticker: build_passthrough_result(data, scores.get(ticker), levels.get(ticker)) for ticker, data in tickers_data.items()}
+            
+        save_results(results)
+        logging.info(f"Passthrough complete. Saved {len(results)} results to {OUTPUT_FILE}")
+        return results, True
 
     # Fetch Market Context
     logging.info("Fetching Market Context (SPY)...")
     market_context = get_market_context()
     logging.info(f"Context: {market_context}")
 
-    # Batching config
-    BATCH_SIZE = 50
-    model_id = 'gemini-flash-latest' # Maps to 1.5 Flash usually
-    
     results = {}
-    ticker_list = list(tickers_data.keys())
-    
-    for i in range(0, len(ticker_list), BATCH_SIZE):
-        batch_keys = ticker_list[i:i + BATCH_SIZE]
-        batch_data = {k: tickers_data[k] for k in batch_keys}
-        
-        logging.info(f"Processing batch {i//BATCH_SIZE + 1}: {batch_keys}")
-        
-        batch_results = analyze_batch(model_id, batch_data, market_context)
-        
-        # Merge results
-        if isinstance(batch_results, list):
-            for res in batch_results:
-                ticker = res.get('ticker')
-                if ticker:
-                    if ticker not in batch_keys: 
-                        logging.warning(f"LLM hallucinated ticker {ticker} not in batch {batch_keys}")
-                    else:
-                        # Merge LLM results with Algorithmic data
-                        # We prioritize Algo data for 'Priority' and 'Signals', LLM for 'Verdict' and 'Logic'
-                        combined = tickers_data[ticker].copy()
-                        combined.update(res)
-                        
-                        # Explicitly keep Algo Priority if it exists (LLM doesn't calculate it)
-                        if 'priority' in tickers_data[ticker]:
-                             combined['priority'] = tickers_data[ticker]['priority']
-                             
-                        results[ticker] = combined
-        
-        time.sleep(15) # Buffer between batches
+    ticker_list = select_for_llm(scores)
+    logging.info(f"Pre-ranking: sending {len(ticker_list)}/{len(tickers_data)} tickers to the LLM "
+                 f"(min score {LLM_MIN_SCORE}, max {LLM_MAX_TICKERS}, backend {llm_clients.LLM_BACKEND}).")
+
+    answers = analyze_with_llm(client, ticker_list, tickers_data, market_context)
+    if len(answers) < len(ticker_list):
+        logging.warning(f"LLM answered {len(answers)}/{len(ticker_list)} tickers; the rest use algo signals.")
+    for ticker, res in answers.items():
+        # Merge LLM results with Algorithmic data
+        # We prioritize Algo data for 'Priority' and 'Signals', LLM for 'Verdict' and 'Logic'
+        combined = tickers_data[ticker].copy()
+        combined.update(res)
+        combined['score'] = scores[ticker]
+        # Fields the LLM left out fall back to the rule-based levels
+        rule_levels = levels.get(ticker, {})
+        for field, value in rule_levels.items():
+            if not combined.get(field):
+                combined[field] = value
+        # The numeric level belongs to the rule-based invalidation text only
+        if combined.get('invalidation_level') != rule_levels.get('invalidation_level'):
+            combined.pop('invalidation_price', None)
+
+        # Explicitly keep Algo Priority if it exists (LLM doesn't calculate it)
+        if 'priority' in tickers_data[ticker]:
+             combined['priority'] = tickers_data[ticker]['priority']
+
+        results[ticker] = combined
+
+    # Below-threshold tickers (and any the LLM dropped) keep their algo signals
+    for ticker, data in tickers_data.items():
+        if ticker not in results:
+            results[ticker] = build_passthrough_result(data, scores.get(ticker), levels.get(ticker))
         
-    with open(OUTPUT_FILE, 'w') as f:
-        json.dump(results, f, indent=4)
+    save_results(results)
     logging.info(f"Analysis complete. Results saved to {OUTPUT_FILE}")
+    return results, len(answers) == len(ticker_list)
 
 if __name__ == "__main__":
     run_analysis()
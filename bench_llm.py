@@ -0,0 +1,97 @@
+import argparse
+import json
+import time
+
+import analyze_vsa
+import llm_clients
+
+MARKET_CONTEXT = "General Market (SPY) Trend: BULLISH. Last Day Move: UP."
+
+def make_tickers_data(n_tickers):
+    """Minimal filtered results: enough for analyze_batch to build a realistic prompt."""
+    tickers_data = {}
+    for i in range(n_tickers):
+        signal_type = "STOPPING_VOLUME" if i % 2 else "BUYING_CLIMAX"
+        signal = {"signal": "DETECTED", "type": signal_type, "status": "CONFIRMED_EARLY",
+                  "anchor_date": "2026-09-28", "test1_date": "2026-10-05", "test2_date": None}
+        bars = {f"2026-09-{day:02d}": {"Open": 100.0, "High": 104.0, "Low": 98.0, "Close": 102.0 + i % 3,
+                                       "Volume": 1e6, "Spread": 6.0, "CLV": 0.33, "RelVol": 1.1}
+                for day in (7, 14, 21, 28)}
+        tickers_data[f"T{i:05d}"] = {
+            "reason": f"Weekly:{signal_type} status:CONFIRMED_EARLY",
+            "quarterly_context": "BULLISH_TREND", "monthly_context": "BULLISH_TREND", "weekly_context": "BULLISH_TREND",
+            "weekly_signal": signal, "monthly_signal": {"signal": "NONE"},
+            "weekly_sequences": [signal], "monthly_sequences": [],
+            "weekly_data": bars, "monthly_data": bars,
+        }
+    return tickers_data
+
+def run_config(tickers_data, batch_size, concurrency, args):
+    """One benchmark run against a fresh fake backend; returns its measurements."""
+    analyze_vsa.LLM_BATCH_SIZE = batch_size
+    analyze_vsa.LLM_CONCURRENCY = concurrency
+    analyze_vsa.LLM_BATCH_PAUSE = args.batch_pause
+    analyze_vsa.LLM_RETRY_DELAY = args.retry_delay
+    fake = llm_clients.FakeLLMClient(args.latency, args.rate_limit, args.malformed, args.drop, args.seed)
+    server = None
+    if args.backend == 'fake-http':
+        # Same fake behind a local HTTP server, called through GeminiClient and the SDK
+        server = llm_clients.FakeGeminiServer(fake).start()
+        client = llm_clients.GeminiClient("fake-key", endpoint=server.endpoint)
+    else:
+        client = fake
+
+    start = time.perf_counter()
+    try:
+        answers = analyze_vsa.analyze_with_llm(client, list(tickers_data), tickers_data, MARKET_CONTEXT)
+    finally:
+        if server:
+            server.stop()
+    elapsed = time.perf_counter() - start
+    return {
+        'batch_size': batch_size,
+        'concurrency': concurrency,
+        'seconds': round(elapsed, 2),
+        'tickers_per_s': round(len(tickers_data) / elapsed, 1),
+        'coverage': round(len(answers) / len(tickers_data), 3),
+        **fake.stats,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LLM batching, retries and concurrency offline against the fake backend.")
+    parser.add_argument('--tickers', type=int, default=200)
+    parser.add_argument('--backend', choices=['fake', 'fake-http'], default='fake',
+                        help="fake-http goes through GeminiClient and the SDK to a local HTTP stand-in")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[10, 25, 50])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--latency', type=float, default=0.2, help="Seconds per fake LLM call")
+    parser.add_argument('--rate-limit', type=float, default=0.1, help="Probability of a 429 per call")
+    parser.add_argument('--malformed', type=float, default=0.05, help="Probability of a malformed response per call")
+    parser.add_argument('--drop', type=float, default=0.02, help="Probability of dropping a ticker from a response")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--batch-pause', type=float, default=0.1, help="Overrides LLM_BATCH_PAUSE (15s in production)")
+    parser.add_argument('--retry-delay', type=float, default=0.3, help="Overrides LLM_RETRY_DELAY (30s in production)")
+    parser.add_argument('--output', help="Write the measurements as JSON")
+    args = parser.parse_args()
+
+    # Quiet the per-batch logging; the table below is the output
+    analyze_vsa.logging.getLogger().setLevel(analyze_vsa.logging.ERROR)
+
+    tickers_data = make_tickers_data(args.tickers)
+    print(f"{args.tickers} tickers, backend {args.backend}, latency {args.latency}s, 429 {args.rate_limit:.0%}, "
+          f"malformed {args.malformed:.0%}, drop {args.drop:.0%}, seed {args.seed}")
+    print(f"{'batch':>5} {'conc':>4} {'seconds':>8} {'tick/s':>7} {'coverage':>8} {'calls':>5} {'429s':>4} {'bad':>4} {'drop':>4}")
+    runs = []
+    for batch_size in args.batch_sizes:
+        for concurrency in args.concurrency:
+            run = run_config(tickers_data, batch_size, concurrency, args)
+            runs.append(run)
+            print(f"{batch_size:>5} {concurrency:>4} {run['seconds']:>8.2f} {run['tickers_per_s']:>7.1f} "
+                  f"{run['coverage']:>8.1%} {run['calls']:>5} {run['rate_limited']:>4} {run['malformed']:>4} {run['dropped']:>4}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(runs, f, indent=2)
+
+if __name__ == "__main__":
+    main()
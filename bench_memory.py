@@ -0,0 +1,56 @@
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import synthetic_data
+import vsa_utils
+
+def run_worker(mode, n_tickers, n_bars):
+    """Builds and keeps feature frames for n_tickers (as a backtest would), then prints peak RSS as JSON."""
+    low_memory = mode == 'low'
+    start = time.perf_counter()
+    frames = {}
+    for i in range(n_tickers):
+        df = synthetic_data.make_ohlcv(n_bars, interval='1d', seed=i)
+        if low_memory:
+            # Same as filter_tickers.get_data in low-memory mode: prune at ingest
+            df = vsa_utils.compact_frame(df)
+        frames[f"T{i:05d}"] = vsa_utils.prepare_vsa_features(df, low_memory=low_memory)
+    elapsed = time.perf_counter() - start
+    frame_mb = sum(df.memory_usage(deep=True).sum() for df in frames.values()) / (1024 * 1024)
+    print(json.dumps({'mode': mode, 'peak_rss_mb': vsa_utils.peak_rss_mb(), 'frames_mb': frame_mb, 'seconds': elapsed}))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare peak memory of default vs low-memory (VSA_LOW_MEMORY=1) feature frames.")
+    parser.add_argument('--tickers', type=int, default=2000)
+    parser.add_argument('--bars', type=int, default=1250, help="Daily bars per ticker (1250 ~ 5 years)")
+    parser.add_argument('--worker', choices=['default', 'low'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.tickers, args.bars)
+        return
+
+    # Each mode runs in its own process so peak RSS is not shared
+    stats = {}
+    for mode in ('default', 'low'):
+        out = subprocess.run(
+            [sys.executable, __file__, '--worker', mode, '--tickers', str(args.tickers), '--bars', str(args.bars)],
+            capture_output=True, text=True, check=True
+        )
+        stats[mode] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    default, low = stats['default'], stats['low']
+    print(f"{args.tickers} tickers x {args.bars} bars")
+    print(f"  frames : {default['frames_mb']:8.1f} MB -> {low['frames_mb']:8.1f} MB")
+    if default['peak_rss_mb'] is None:
+        print("  peak RSS: unavailable on this platform")
+        return
+    saved = default['peak_rss_mb'] - low['peak_rss_mb']
+    print(f"  peak RSS: {default['peak_rss_mb']:8.1f} MB -> {low['peak_rss_mb']:8.1f} MB "
+          f"(saved {saved:.1f} MB, {saved / default['peak_rss_mb']:.0%})")
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,17 @@ import streamlit as st
 import pandas as pd
 import glob
 import os
+import sys
 import subprocess
 from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
 
 st.set_page_config(page_title="VSA Daily Dashboard", layout="wide")
 
+# Repo root holds the screener modules and state files
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+import signal_lifecycle
+
 # --- CUSTOM CSS FOR "WOW" FACTOR ---
 st.markdown("""
     <style>
@@ -36,6 +42,8 @@ if st.sidebar.button("🔄 Pull Latest Data (Git Pull)"):
         except Exception as e:
             st.sidebar.error(f"Error: {e}")
 
+delta_only = st.sidebar.checkbox("Show only changes since previous report", value=False)
+
 # --- DATA LOADING ---
 @st.cache_data(ttl=300) # Cache for 5 mins
 def load_latest_report():
@@ -52,8 +60,47 @@ def load_latest_report():
     df = pd.read_csv(latest_file)
     return df, os.path.basename(latest_file)
 
+@st.cache_data(ttl=300)
+def load_latest_delta():
+    """Latest DELTA_*.csv written by generate_report.py (a few rows, not the full report)."""
+    delta_files = glob.glob(os.path.join(BASE_DIR, "reports", "DELTA_*.csv"))
+    if not delta_files:
+        return None, None
+    latest_file = max(delta_files)
+    return pd.read_csv(latest_file), os.path.basename(latest_file)
+
+def show_delta(delta_df, delta_name):
+    st.markdown(f"## 🔁 Changes Since Previous Report (`{delta_name}`)")
+    counts = delta_df['Change'].value_counts()
+    cols = st.columns(5)
+    for col, change in zip(cols, ['NEW', 'DROPPED', 'PRIORITY_CHANGE', 'ACTION_CHANGE', 'INVALIDATED']):
+        col.metric(change.replace('_', ' ').title(), int(counts.get(change, 0)))
+    st.dataframe(delta_df, use_container_width=True, hide_index=True)
+
+if delta_only:
+    # Only the small delta file is read; the full report is skipped entirely
+    delta_df, delta_name = load_latest_delta()
+    if delta_df is None:
+        st.error("No delta found in `reports/` (it needs a previous report to compare against).")
+    else:
+        show_delta(delta_df, delta_name)
+    st.stop()
+
 df, filename = load_latest_report()
 
+@st.cache_data(ttl=300)
+def load_lifecycle_changes():
+    """New today / upgraded / downgraded / expired setups from the lifecycle store, as DataFrames."""
+    state = signal_lifecycle.load_state(os.path.join(BASE_DIR, signal_lifecycle.STATE_FILE))
+    if not state.get('last_run'):
+        return None, {}
+    cols = ['ticker', 'timeframe', 'type', 'status', 'anchor_date', 'first_seen', 'last_seen']
+    changes = {
+        key: pd.DataFrame(entries, columns=cols + ['transitions'])[cols]
+        for key, entries in signal_lifecycle.daily_changes(state).items()
+    }
+    return state['last_run'], changes
+
 # --- AGGRID HELPER ---
 def show_aggrid(df, key):
     gb = GridOptionsBuilder.from_dataframe(df)
@@ -149,6 +196,25 @@ else:
         else:
             st.markdown("*No high-confidence long setups.*")
 
+    # --- DAY-OVER-DAY DELTA ---
+    delta_df, delta_name = load_latest_delta()
+    if delta_df is not None:
+        show_delta(delta_df, delta_name)
+
+    # --- SETUP LIFECYCLE ---
+    lifecycle_date, lifecycle = load_lifecycle_changes()
+    if lifecycle_date:
+        st.markdown(f"## 🔄 Setup Lifecycle ({lifecycle_date})")
+        tabs = st.tabs([f"🆕 New ({len(lifecycle['new'])})", f"♻️ Revived ({len(lifecycle['revived'])})",
+                        f"⬆️ Upgraded ({len(lifecycle['upgraded'])})",
+                        f"⬇️ Downgraded ({len(lifecycle['downgraded'])})", f"⌛ Expired ({len(lifecycle['expired'])})"])
+        for tab, key in zip(tabs, ['new', 'revived', 'upgraded', 'downgraded', 'expired']):
+            with tab:
+                if lifecycle[key].empty:
+                    st.markdown("*None today.*")
+                else:
+                    st.dataframe(lifecycle[key], use_container_width=True, hide_index=True)
+
     # --- ALL TRADES EXPANDER ---
     with st.expander("📂 View All Data (Raw)"):
         show_aggrid(df, key="main_grid")
@@ -0,0 +1,163 @@
+import argparse
+import json
+import logging
+import os
+import time
+from collections import deque
+
+# Tickers whose fetch failed on DEAD_LETTER_AFTER consecutive runs are skipped until reviewed
+DEAD_LETTER_FILE = 'dead_letter.json'
+DEAD_LETTER_AFTER = 3
+# A run where more than this share of tickers failed (outage, blocked IP) records no failures at all
+DEAD_LETTER_MAX_FAILURE_RATE = 0.5
+
+# Failed fetches are retried at the end of the run, in rounds with exponential backoff
+RETRY_ROUNDS = int(os.environ.get("VSA_FETCH_RETRY_ROUNDS", "3"))
+RETRY_BASE_DELAY = float(os.environ.get("VSA_FETCH_RETRY_DELAY", "5"))
+
+# Circuit breaker: pause fetching when the error rate over the last BREAKER_WINDOW fetches reaches
+# BREAKER_ERROR_RATE. The pause doubles on every trip in a run, up to BREAKER_MAX_COOLDOWN.
+BREAKER_WINDOW = 20
+BREAKER_ERROR_RATE = 0.5
+BREAKER_COOLDOWN = float(os.environ.get("VSA_BREAKER_COOLDOWN", "60"))
+BREAKER_MAX_COOLDOWN = 600
+# After this many trips in a run the provider is treated as down: the remaining fetches are abandoned
+BREAKER_MAX_TRIPS = int(os.environ.get("VSA_BREAKER_MAX_TRIPS", "5"))
+
+class FetchError(Exception):
+    """
+    A price history fetch failed. provider_error is False when the provider answered but had
+    no data for the ticker (delisted, bad symbol): it still counts as a failure for the ticker,
+    but says nothing about provider health.
+    """
+
+    def __init__(self, message, provider_error=True):
+        super().__init__(message)
+        self.provider_error = provider_error
+
+class ProviderUnavailable(Exception):
+    """The circuit breaker used up its trips for this run; no further fetches should be made."""
+
+class CircuitBreaker:
+    """Sliding-window error rate over recent fetches; wait() pauses while the breaker is open."""
+
+    def __init__(self, window=BREAKER_WINDOW, error_rate=BREAKER_ERROR_RATE, cooldown=BREAKER_COOLDOWN,
+                 max_trips=BREAKER_MAX_TRIPS):
+        self.outcomes = deque(maxlen=window)
+        self.error_rate = error_rate
+        self.cooldown = cooldown
+        self.max_trips = max_trips
+        self.trips = 0
+
+    def record(self, ok):
+        self.outcomes.append(ok)
+
+    def is_open(self):
+        if len(self.outcomes) < self.outcomes.maxlen:
+            return False
+        return self.outcomes.count(False) / len(self.outcomes) >= self.error_rate
+
+    def wait(self):
+        """
+        Sleeps out the cooldown if the breaker is open, then lets fetches through again (half-open).
+        Raises ProviderUnavailable when it opens again after max_trips trips.
+        """
+        if not self.is_open():
+            return
+        if self.trips >= self.max_trips:
+            raise ProviderUnavailable(f"Circuit breaker open again after {self.trips} trips: "
+                                      f"{self.outcomes.count(False)}/{len(self.outcomes)} recent fetches failed.")
+        self.trips += 1
+        pause = min(self.cooldown * 2 ** (self.trips - 1), BREAKER_MAX_COOLDOWN)
+        logging.warning(f"Circuit breaker open: {self.outcomes.count(False)}/{len(self.outcomes)} recent fetches "
+                        f"failed. Pausing fetches for {pause:.0f}s (trip {self.trips}).")
+        time.sleep(pause)
+        self.outcomes.clear()
+
+def backoff_delay(retry_round):
+    """Delay before retry round 1, 2, 3...: RETRY_BASE_DELAY, x2, x4..."""
+    return RETRY_BASE_DELAY * 2 ** (retry_round - 1)
+
+def load_dead_letter(path=DEAD_LETTER_FILE):
+    """{ticker: {'failed_runs', 'first_failed', 'last_failed', 'last_error', 'dead_lettered'}}"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable {path}: {e}")
+        return {}
+
+def save_dead_letter(entries, path=DEAD_LETTER_FILE):
+    with open(path, 'w') as f:
+        json.dump(entries, f, indent=1, sort_keys=True)
+
+def dead_lettered(entries):
+    return {ticker for ticker, entry in entries.items() if entry.get('dead_lettered')}
+
+def countable_failures(failed, provider_failed, attempted, breaker):
+    """
+    The failures ({ticker: error}) that count toward the dead letter. A provider outage must not
+    dead-letter the universe: none count when most tickers failed, and when the breaker tripped only
+    tickers whose last failure was not a provider error (no data for the ticker) count.
+    """
+    if attempted and len(failed) / attempted > DEAD_LETTER_MAX_FAILURE_RATE:
+        return {}
+    if breaker.trips:
+        return {ticker: error for ticker, error in failed.items() if ticker not in provider_failed}
+    return dict(failed)
+
+def update_dead_letter(entries, succeeded, failed, run_date):
+    """
+    Records this run's outcome per ticker: a success clears the ticker's failure history,
+    a failure (after all retries) counts one failed run. Returns the newly dead-lettered tickers.
+    'failed' is {ticker: last error message}.
+    """
+    for ticker in succeeded:
+        entries.pop(ticker, None)
+
+    newly_dead = []
+    for ticker, error in failed.items():
+        entry = entries.setdefault(ticker, {'failed_runs': 0, 'first_failed': run_date, 'dead_lettered': False})
+        if entry.get('last_failed') != run_date:
+            entry['failed_runs'] += 1
+        entry['last_failed'] = run_date
+        entry['last_error'] = error
+        if not entry['dead_lettered'] and entry['failed_runs'] >= DEAD_LETTER_AFTER:
+            entry['dead_lettered'] = True
+            newly_dead.append(ticker)
+    return newly_dead
+
+def fetch_summary(attempted, succeeded, failed, retried, skipped, breaker, prescreen_failed=0, abandoned=0):
+    """
+    One-line fetch health summary for the log. Counts are per ticker over both phases;
+    prescreen_failed tickers had a failed prescreen fetch and went on to the full fetch,
+    abandoned tickers were not fetched because the breaker ran out of trips.
+    """
+    rate = len(succeeded) / attempted if attempted else 1.0
+    return (f"Fetch health: {len(succeeded)}/{attempted} succeeded ({rate:.1%}), "
+            f"{prescreen_failed} failed the prescreen fetch, "
+            f"{len(retried)} needed a retry, {len(failed)} failed after retries, {abandoned} abandoned, "
+            f"{skipped} dead-lettered skipped, circuit breaker tripped {breaker.trips}x.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Review the fetch dead-letter list.")
+    parser.add_argument('--release', nargs='+', metavar='TICKER', help="Remove reviewed tickers so they are fetched again")
+    args = parser.parse_args()
+
+    entries = load_dead_letter()
+    if args.release:
+        for ticker in args.release:
+            if entries.pop(ticker.upper(), None) is None:
+                print(f"{ticker.upper()} is not in {DEAD_LETTER_FILE}")
+        save_dead_letter(entries)
+
+    for ticker, entry in sorted(entries.items()):
+        state = "DEAD" if entry.get('dead_lettered') else "failing"
+        print(f"{ticker:<8} {state:<8} {entry['failed_runs']} runs, last {entry.get('last_failed')}: {entry.get('last_error')}")
+    if not entries:
+        print(f"{DEAD_LETTER_FILE} is empty.")
+
+if __name__ == "__main__":
+    main()
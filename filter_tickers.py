@@ -1,27 +1,57 @@
-import yfinance as yf
-import pandas as pd
 import json
 import os
+import re
 import logging
-import vsa_utils
 import time
-import requests_cache
+from datetime import datetime
 
-# Enable caching to avoid hitting API repeatedly for same data
-requests_cache.install_cache('yfinance_cache', expire_after=3600) # Cache for 1 hour
+import fetch_guard
+import signal_lifecycle
+
+# Heavy modules (yfinance, requests_cache, pandas via vsa_utils) are imported on the code
+# paths that need them, so empty runs and `vsa` CLI invocations start fast.
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-import sys
+TICKER_FILE = 'tickers.txt'
+OUTPUT_FILE = 'filtered_tickers.json'
+# Watchlist names are used in file and directory names (filtered_tickers_<name>.json, reports/<name>/)
+WATCHLIST_NAME = re.compile(r'[A-Za-z0-9_-]+')
 
-def get_ticker_file():
-    if len(sys.argv) > 1:
-        return sys.argv[1]
-    return 'tickers.txt'
+# Bars scanned by check_vsa_sequence for an Anchor
+SEQUENCE_LOOKBACK = 5
+SMA_PERIOD = 20
+# Extra SMA windows computed alongside the VSA features, in one cumulative-sum pass per series and
+# timeframe (vsa_utils.calculate_rolling_features). get_trend reads Close_SMA<TREND_WINDOW>, which
+# feature_windows always adds for weekly and monthly.
+TREND_WINDOW = 20
+FEATURE_WINDOWS = {'weekly': (), 'monthly': (), 'daily': ()}
+# Long lookback for the full sequence structure given to the LLM and the report (matched tickers only)
+FULL_SCAN_LOOKBACK = {'weekly': 52, 'monthly': 24}
 
-TICKER_FILE = get_ticker_file()
-OUTPUT_FILE = 'filtered_tickers.json'
+# Phase 1 prescreen: trailing volumes stored from previous runs + a short fetch of recent bars
+VOLUME_STATS_FILE = 'volume_stats.json'
+VOLUME_STATS_BARS = SMA_PERIOD + SEQUENCE_LOOKBACK + 5
+PRESCREEN_PERIODS = {'weekly': ('1mo', '1wk'), 'monthly': ('3mo', '1mo')}
+# The stored tail is only trusted while it agrees with the provider: a ticker goes to phase 2
+# when completed bars seen in both differ by more than VOLUME_REVISION_TOLERANCE (reverse
+# split, volume revision) or when its last full fetch is older than VOLUME_STATS_MAX_AGE_DAYS.
+VOLUME_REVISION_TOLERANCE = 0.05
+VOLUME_STATS_MAX_AGE_DAYS = 30
+
+# Low-memory mode: drop Dividends/Stock Splits/Capital Gains at ingest and keep features as float32
+LOW_MEMORY = os.environ.get("VSA_LOW_MEMORY", "0") == "1"
+
+# Pause between tickers to be nice to the API
+REQUEST_DELAY = 0.1
+
+def feature_windows(timeframe):
+    """FEATURE_WINDOWS for the timeframe, plus TREND_WINDOW on the timeframes get_trend reads."""
+    windows = set(FEATURE_WINDOWS.get(timeframe, ()))
+    if timeframe in ('weekly', 'monthly'):
+        windows.add(TREND_WINDOW)
+    return tuple(sorted(windows))
 
 def load_tickers(filename):
     if not os.path.exists(filename):
@@ -30,168 +60,498 @@ def load_tickers(filename):
     with open(filename, 'r') as f:
         return [line.strip().upper() for line in f if line.strip()]
 
+_http_cache_installed = False
+
+def install_http_cache():
+    """Enable caching to avoid hitting API repeatedly for same data (once, on first fetch)."""
+    global _http_cache_installed
+    if not _http_cache_installed:
+        import requests_cache
+        requests_cache.install_cache('yfinance_cache', expire_after=3600) # Cache for 1 hour
+        _http_cache_installed = True
+
+def fetch_history(ticker, period, interval):
+    """
+    Single entry point for price history. The scale harness (scale_test.py) swaps this
+    for a local stub data source.
+    """
+    import yfinance as yf
+    install_http_cache()
+    return yf.Ticker(ticker).history(period=period, interval=interval)
+
+def guarded_fetch(ticker, period, interval):
+    """fetch_history that raises fetch_guard.FetchError on failure or when no bars come back."""
+    try:
+        df = fetch_history(ticker, period=period, interval=interval)
+    except Exception as e:
+        raise fetch_guard.FetchError(f"Error fetching {interval} data for {ticker}: {e}") from e
+    if df.empty:
+        raise fetch_guard.FetchError(f"No {interval} data found for {ticker}", provider_error=False)
+    return df
+
 def get_data(ticker):
+    """Weekly and monthly history; raises fetch_guard.FetchError if either fetch fails."""
+    # Weekly Data
+    df_weekly = guarded_fetch(ticker, period="2y", interval="1wk")
+    # Monthly Data
+    df_monthly = guarded_fetch(ticker, period="5y", interval="1mo")
+
+    # Clean empty rows
+    df_weekly = df_weekly.dropna()
+    df_monthly = df_monthly.dropna()
+
+    if LOW_MEMORY:
+        import vsa_utils
+        df_weekly = vsa_utils.compact_frame(df_weekly)
+        df_monthly = vsa_utils.compact_frame(df_monthly)
+
+    return df_weekly, df_monthly
+
+
+
+def load_volume_stats():
+    if not os.path.exists(VOLUME_STATS_FILE):
+        return {}
     try:
-        stock = yf.Ticker(ticker)
-        
-        # Weekly Data
-        df_weekly = stock.history(period="2y", interval="1wk")
-        # Monthly Data
-        df_monthly = stock.history(period="5y", interval="1mo") 
-        
-        if df_weekly.empty or df_monthly.empty:
-            logging.warning(f"No data found for {ticker}")
-            return None, None
+        with open(VOLUME_STATS_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable {VOLUME_STATS_FILE}: {e}")
+        return {}
 
-        # Clean empty rows
-        df_weekly = df_weekly.dropna()
-        df_monthly = df_monthly.dropna()
+def save_volume_stats(stats):
+    with open(VOLUME_STATS_FILE, 'w') as f:
+        json.dump(stats, f)
 
-        return df_weekly, df_monthly
+def volume_tail(df, n=VOLUME_STATS_BARS):
+    """Last n bar volumes as {YYYY-MM-DD: volume} (the stored aggregate used by the prescreen)."""
+    tail = df['Volume'].tail(n)
+    return {d.strftime('%Y-%m-%d'): float(v) for d, v in tail.items()}
+
+def update_volume_stats(stats, ticker, df_weekly, df_monthly):
+    stats[ticker] = {'weekly': volume_tail(df_weekly), 'monthly': volume_tail(df_monthly),
+                     'refreshed': datetime.now().strftime('%Y-%m-%d')}
+
+def volume_stats_stale(cached):
+    """True if the cached tail was last rebuilt from a full fetch too long ago (or never recorded)."""
+    refreshed = cached.get('refreshed')
+    if not refreshed:
+        return True
+    age = datetime.now() - datetime.strptime(refreshed, '%Y-%m-%d')
+    return age.days > VOLUME_STATS_MAX_AGE_DAYS
+
+def volumes_agree(cached, recent):
+    """
+    Compares the completed bars present in both the cache and the fresh fetch. The last cached
+    bar may have been still forming when it was stored, and the last fetched bar is forming now,
+    so neither is compared.
+    """
+    overlap = (set(cached) & set(recent)) - {max(cached), max(recent)}
+    for d in overlap:
+        old, new = cached[d], recent[d]
+        if abs(new - old) > VOLUME_REVISION_TOLERANCE * max(abs(old), abs(new)):
+            return False
+    return True
+
+def merge_recent_volumes(cached, df_recent):
+    """
+    Rolls the cached volume tail forward with freshly fetched bars (which also refresh the
+    still-forming last bar). Returns a date-ordered Series, or None if the recent window
+    does not overlap the cache (a gap would make the SMA wrong) or disagrees with it (the
+    cached volumes are in different units now, e.g. after a reverse split).
+    """
+    if not cached or df_recent.empty:
+        return None
+    recent = volume_tail(df_recent, n=len(df_recent))
+    if min(recent) > max(cached):
+        return None
+    if not volumes_agree(cached, recent):
+        return None
+    import pandas as pd
+    merged = {**cached, **recent}
+    dates = sorted(merged)[-VOLUME_STATS_BARS:]
+    return pd.Series([merged[d] for d in dates], index=dates)
+
+def prescreen_ticker(ticker, stats, breaker):
+    """
+    Phase 1: decides from a short recent fetch + stored volumes whether an Anchor is possible
+    on the weekly or monthly chart. Returns False only when it is proven impossible on both;
+    the rolled-forward volumes are written back to 'stats' in that case.
+    The fetches go through the circuit breaker like phase 2; raises fetch_guard.FetchError
+    when one fails (the ticker then needs phase 2, which retries it) and
+    fetch_guard.ProviderUnavailable when the breaker gives up.
+    """
+    cached = stats.get(ticker)
+    if not cached or volume_stats_stale(cached):
+        return True
+    import vsa_utils
+
+    rolled = {}
+    try:
+        for timeframe, (period, interval) in PRESCREEN_PERIODS.items():
+            breaker.wait()
+            try:
+                df_recent = guarded_fetch(ticker, period, interval).dropna()
+            except fetch_guard.FetchError as e:
+                breaker.record(not e.provider_error)
+                raise
+            breaker.record(True)
+            volumes = merge_recent_volumes(cached.get(timeframe), df_recent)
+            if volumes is None:
+                return True
+            if vsa_utils.anchor_possible(volumes, SMA_PERIOD, SEQUENCE_LOOKBACK):
+                return True
+            rolled[timeframe] = dict(volumes.items())
+    except (fetch_guard.FetchError, fetch_guard.ProviderUnavailable):
+        raise
     except Exception as e:
-        logging.error(f"Error fetching data for {ticker}: {e}")
-        return None, None
+        logging.warning(f"Prescreen failed for {ticker}, keeping it: {e}")
+        return True
+    finally:
+        time.sleep(REQUEST_DELAY)
+
+    stats[ticker] = {**rolled, 'refreshed': cached['refreshed']}
+    return False
 
+def parse_watchlists(specs):
+    """
+    ['core=tickers.txt', 'test=test.txt'] -> {'core': 'tickers.txt', 'test': 'test.txt'}
+    Names become file and directory names (filtered_tickers_<name>.json, reports/<name>/),
+    so only letters, digits, '_' and '-' are accepted.
+    """
+    watchlists = {}
+    for spec in specs:
+        name, sep, path = spec.partition('=')
+        if not sep or not name or not path:
+            raise ValueError(f"Watchlist must be given as name=path, got '{spec}'")
+        if not WATCHLIST_NAME.fullmatch(name):
+            raise ValueError(f"Watchlist name '{name}' may only contain letters, digits, '_' and '-'")
+        if name in watchlists:
+            raise ValueError(f"Duplicate watchlist name '{name}'")
+        watchlists[name] = path
+    return watchlists
 
+def watchlist_output(name):
+    return f"filtered_tickers_{name}.json"
+
+def save_filtered(filtered_results, path=OUTPUT_FILE):
+    with open(path, 'w') as f:
+        json.dump(filtered_results, f, indent=4)
+    logging.info(f"Saved {len(filtered_results)} filtered tickers to {path}")
 
-def process_tickers():
-    tickers = load_tickers(TICKER_FILE)
+def process_tickers(ticker_file=TICKER_FILE):
+    return screen_ticker_file(ticker_file)[0]
+
+def screen_ticker_file(ticker_file=TICKER_FILE):
+    """process_tickers, also reporting whether every ticker was fetched: (results, complete)."""
+    tickers = load_tickers(ticker_file)
     logging.info(f"Loaded {len(tickers)} tickers.")
+    filtered_results, complete = screen_tickers(tickers)
+    save_filtered(filtered_results)
+    return filtered_results, complete
+
+def process_watchlists(watchlists):
+    """
+    Screens several named ticker lists ({name: ticker_file}) in one run. Each unique ticker is
+    fetched and scanned once; results are tagged with the lists they belong to ('watchlists').
+    Writes the combined OUTPUT_FILE (input of analyze_vsa.py) plus filtered_tickers_<name>.json
+    per list, and returns the combined results.
+    """
+    return screen_watchlists(watchlists)[0]
+
+def screen_watchlists(watchlists):
+    """process_watchlists, also reporting whether every ticker was fetched: (results, complete)."""
+    lists = {name: load_tickers(path) for name, path in watchlists.items()}
+    members = {name: set(tickers) for name, tickers in lists.items()}
+    union = list(dict.fromkeys(t for tickers in lists.values() for t in tickers))
+    logging.info(f"Loaded {len(lists)} watchlists ({', '.join(lists)}): "
+                 f"{sum(len(t) for t in lists.values())} tickers, {len(union)} unique.")
+
+    filtered_results, complete = screen_tickers(union)
+    for ticker, data in filtered_results.items():
+        data['watchlists'] = [name for name, tickers in members.items() if ticker in tickers]
+    save_filtered(filtered_results)
+
+    for name, tickers in members.items():
+        save_filtered({t: d for t, d in filtered_results.items() if t in tickers}, watchlist_output(name))
+    return filtered_results, complete
+
+def screen_ticker(ticker, volume_stats):
+    """
+    Phase 2 for one ticker: full history fetch and sequence scan. Returns the filtered result,
+    or None if it has no signal. Raises fetch_guard.FetchError when a fetch fails.
+    """
+    import vsa_utils
+
+    df_weekly, df_monthly = get_data(ticker)
+
+    update_volume_stats(volume_stats, ticker, df_weekly, df_monthly)
+
+    # Prepare VSA Features (Calculate RelVol, CLV, Spread)
+    df_weekly = vsa_utils.prepare_vsa_features(df_weekly, SMA_PERIOD, LOW_MEMORY, feature_windows('weekly'))
+    df_monthly = vsa_utils.prepare_vsa_features(df_monthly, SMA_PERIOD, LOW_MEMORY, feature_windows('monthly'))
     
-    filtered_results = {}
+    # 1. Quarterly Context (Resample Monthly)
+    df_quarterly = df_monthly.resample('3ME').agg({
+        'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'
+    }).dropna()
     
-    for ticker in tickers:
-        try:
-            df_weekly, df_monthly = get_data(ticker)
+    # Simple Trend Logic for Quarterly
+    q_context = "NEUTRAL"
+    if len(df_quarterly) >= 2:
+        last_q = df_quarterly.iloc[-1]
+        prev_q = df_quarterly.iloc[-2]
+        if last_q['Close'] > prev_q['Close']:
+            q_context = "BULLISH_TREND"
+        else:
+            q_context = "BEARISH_TREND"
+
+    # 2. Run Sequence Logic
+    weekly_seq = vsa_utils.check_vsa_sequence(df_weekly, SEQUENCE_LOOKBACK)
+    monthly_seq = vsa_utils.check_vsa_sequence(df_monthly, SEQUENCE_LOOKBACK)
+    
+    # Filter Logic: Keep if ANY sequence detected OR Monthly Context is strong
+    has_signal = (weekly_seq['signal'] != 'NONE') or (monthly_seq['signal'] != 'NONE')
+    
+    if has_signal:
+        logging.info(f"MATCH: {ticker} | W:{weekly_seq.get('status')} M:{monthly_seq.get('status')}")
+        
+        # Setup serialization
+        def serialize_df(df, n=25):
+            subset = df.tail(n).copy()
+            subset.index = subset.index.strftime('%Y-%m-%d')
+            feature_cols = ['Open', 'High', 'Low', 'Close', 'Volume', 'Spread', 'CLV', 'RelVol']
+            available_cols = [c for c in feature_cols if c in df.columns]
+            subset = subset[available_cols]
+            if LOW_MEMORY:
+                # float32 values serialize with noise (101.12000274658203)
+                subset = subset.astype('float64').round(4)
+            return subset.to_dict(orient='index')
+
+        # Calculate Trend Helper
+        def get_trend(df):
+            if len(df) < TREND_WINDOW: return "NEUTRAL"
+            sma = df[f'Close_SMA{TREND_WINDOW}'].iloc[-1]
+            close = df['Close'].iloc[-1]
+            return "BULLISH_TREND" if close > sma else "BEARISH_TREND"
+
+        w_trend = get_trend(df_weekly)
+        m_trend = get_trend(df_monthly)
+
+        # Fetch Daily Data for context (last 60 days)
+        df_daily = guarded_fetch(ticker, period="6mo", interval="1d")
+        df_daily = vsa_utils.prepare_vsa_features(df_daily, low_memory=LOW_MEMORY, windows=feature_windows('daily'))
+        
+        # Check Daily Confirmation (Micro-Test)
+        daily_conf = "NONE"
+        if len(df_daily) > 5:
+            last_5_daily = df_daily.iloc[-5:]
+            # Simple check: Any test/no supply bar in last 3 days?
+            for i in range(-3, 0):
+                row = last_5_daily.iloc[i]
+                prev = last_5_daily.iloc[i-1]['Close']
+                type_target = 'BULLISH' if "STOPPING" in weekly_seq.get('type', '') else 'BEARISH'
+                if vsa_utils.identify_test_bar(row, prev, type=type_target):
+                    daily_conf = "TEST_OBSERVED"
+                    break
+
+        current_price = df_daily['Close'].iloc[-1]
+        
+        # Determine Priority
+        priority = "LOW"
+        w_status = weekly_seq.get('status', 'NONE') # CONFIRMED_STRONG/EARLY/WATCH
+        m_status = monthly_seq.get('status', 'NONE')
+        
+        is_w_confirmed = "CONFIRMED" in w_status
+        is_m_confirmed = "CONFIRMED" in m_status
+        
+        # Logic per Plan
+        if is_m_confirmed and is_w_confirmed:
+            priority = "VERY_HIGH"
+        elif (is_m_confirmed and "WATCH" in w_status) or (is_m_confirmed and not is_w_confirmed):
+            # Monthly confirmed but weekly just watching or none
+             priority = "MEDIUM" # Downgraded slightly as we want weekly trigger
+        elif "BULLISH" in q_context and is_w_confirmed:
+             priority = "HIGH"
+        elif is_w_confirmed:
+             priority = "MEDIUM"
+        elif "WATCH" in w_status:
+             priority = "LOW"
+
+        return {
+            'reason': f"Weekly:{weekly_seq.get('type')} status:{w_status}",
+            'ticker': ticker,
             
-            if df_weekly is None or df_monthly is None:
-                continue
-                
-            # Rate limit respect
-            time.sleep(0.1) # Small delay to be nice to API
-                
-            # Prepare VSA Features (Calculate RelVol, CLV, Spread)
-            df_weekly = vsa_utils.prepare_vsa_features(df_weekly)
-            df_monthly = vsa_utils.prepare_vsa_features(df_monthly)
+            # Context & Signals
+            'quarterly_context': q_context,
+            'monthly_context': m_trend,
+            'weekly_context': w_trend,
+            'monthly_signal': monthly_seq,
+            'weekly_signal': weekly_seq,
+            'weekly_sequences': vsa_utils.scan_vsa_sequences(df_weekly, FULL_SCAN_LOOKBACK['weekly']),
+            'monthly_sequences': vsa_utils.scan_vsa_sequences(df_monthly, FULL_SCAN_LOOKBACK['monthly']),
+            'daily_confirmation': daily_conf,
+            'priority': priority,
             
-            # 1. Quarterly Context (Resample Monthly)
-            df_quarterly = df_monthly.resample('3ME').agg({
-                'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'
-            }).dropna()
+            # Raw data for LLM
+            'weekly_data': serialize_df(df_weekly),
+            'monthly_data': serialize_df(df_monthly),
+            'daily_data': serialize_df(df_daily, n=60),
             
-            # Simple Trend Logic for Quarterly
-            q_context = "NEUTRAL"
-            if len(df_quarterly) >= 2:
-                last_q = df_quarterly.iloc[-1]
-                prev_q = df_quarterly.iloc[-2]
-                if last_q['Close'] > prev_q['Close']:
-                    q_context = "BULLISH_TREND"
+            # For CSV direct output (Latest bar stats)
+            'latest_weekly_clv': round(float(df_weekly['CLV'].iloc[-1]), 2),
+            'latest_weekly_relvol': round(float(df_weekly['RelVol'].iloc[-1]), 2),
+            'current_price': round(float(current_price), 2)
+        }
+    return None
+
+def screen_tickers(tickers):
+    """
+    Prescreen + full sequence scan of the tickers; updates volume stats and the lifecycle store.
+    Returns (results, complete): complete is False when some tickers could not be fetched.
+    When the circuit breaker runs out of trips the remaining fetches are abandoned.
+    """
+    if not tickers:
+        return {}, True
+
+    import vsa_utils
+    
+    filtered_results = {}
+
+    # Permanently failing tickers are skipped until reviewed (python fetch_guard.py --release ...)
+    dead_letter = fetch_guard.load_dead_letter()
+    skipped = [t for t in tickers if t in fetch_guard.dead_lettered(dead_letter)]
+    if skipped:
+        logging.warning(f"Skipping {len(skipped)} dead-lettered tickers: {', '.join(skipped)}")
+        tickers = [t for t in tickers if t not in set(skipped)]
+
+    # The breaker pauses fetching while the provider is failing, in both phases
+    breaker = fetch_guard.CircuitBreaker()
+
+    # Phase 1: rule out tickers that cannot have an Anchor without fetching full history.
+    # A failed prescreen fetch sends the ticker to phase 2, where it is retried.
+    volume_stats = load_volume_stats()
+    survivors, prescreen_errors, abandoned = [], {}, []
+    for i, ticker in enumerate(tickers):
+        try:
+            keep = prescreen_ticker(ticker, volume_stats, breaker)
+        except fetch_guard.FetchError as e:
+            prescreen_errors[ticker] = str(e)
+            keep = True
+        except fetch_guard.ProviderUnavailable as e:
+            abandoned = tickers[i:]
+            logging.error(f"{e} Abandoning the run: {len(survivors) + len(abandoned)} tickers not screened.")
+            break
+        if keep:
+            survivors.append(ticker)
+    # Tickers actually evaluated this run (prescreen-eliminated ones are proven to have no signal)
+    kept = set(survivors) | set(abandoned)
+    eliminated = [t for t in tickers if t not in kept]
+    screened = set(eliminated)
+    if abandoned:
+        # Survivors are not sent to phase 2 either
+        abandoned, survivors = survivors + abandoned, []
+    else:
+        if prescreen_errors:
+            logging.warning(f"Prescreen fetch failed for {len(prescreen_errors)} tickers, sending them to full fetch: "
+                            f"{', '.join(prescreen_errors)}")
+        logging.info(f"Prescreen eliminated {len(eliminated)}/{len(tickers)} tickers "
+                     f"({len(eliminated) / len(tickers):.1%}); {len(survivors)} need full history.")
+    
+    # Phase 2: full history fetch and sequence scan for the survivors. Failed fetches are queued
+    # and retried at the end in rounds with exponential backoff.
+    queue, errors, retried = survivors, {}, set()
+    # Tickers whose last failure was a provider error (as opposed to no data for the ticker)
+    provider_failed = set()
+    for retry_round in range(fetch_guard.RETRY_ROUNDS + 1):
+        if retry_round:
+            delay = fetch_guard.backoff_delay(retry_round)
+            logging.info(f"Retry round {retry_round}/{fetch_guard.RETRY_ROUNDS}: {len(queue)} tickers, "
+                         f"backing off {delay:.0f}s.")
+            time.sleep(delay)
+            retried.update(queue)
+
+        failed = []
+        for i, ticker in enumerate(queue):
+            try:
+                breaker.wait()
+            except fetch_guard.ProviderUnavailable as e:
+                abandoned = queue[i:]
+                logging.error(f"{e} Abandoning the remaining fetches for {len(abandoned)} tickers.")
+                break
+            try:
+                result = screen_ticker(ticker, volume_stats)
+            except fetch_guard.FetchError as e:
+                breaker.record(not e.provider_error)
+                errors[ticker] = str(e)
+                if e.provider_error:
+                    provider_failed.add(ticker)
                 else:
-                    q_context = "BEARISH_TREND"
+                    provider_failed.discard(ticker)
+                failed.append(ticker)
+                continue
+            except Exception as e:
+                breaker.record(True)
+                errors.pop(ticker, None)
+                logging.error(f"Error processing {ticker}: {e}")
+                continue
+            finally:
+                # Rate limit respect
+                time.sleep(REQUEST_DELAY) # Small delay to be nice to API
 
-            # 2. Run Sequence Logic
-            weekly_seq = vsa_utils.check_vsa_sequence(df_weekly)
-            monthly_seq = vsa_utils.check_vsa_sequence(df_monthly)
-            
-            # Filter Logic: Keep if ANY sequence detected OR Monthly Context is strong
-            has_signal = (weekly_seq['signal'] != 'NONE') or (monthly_seq['signal'] != 'NONE')
-            
-            if has_signal:
-                logging.info(f"MATCH: {ticker} | W:{weekly_seq.get('status')} M:{monthly_seq.get('status')}")
-                
-                # Setup serialization
-                def serialize_df(df, n=25):
-                    subset = df.tail(n).copy()
-                    subset.index = subset.index.strftime('%Y-%m-%d')
-                    feature_cols = ['Open', 'High', 'Low', 'Close', 'Volume', 'Spread', 'CLV', 'RelVol']
-                    available_cols = [c for c in feature_cols if c in df.columns]
-                    return subset[available_cols].to_dict(orient='index')
-
-                # Calculate Trend Helper
-                def get_trend(df):
-                    if len(df) < 20: return "NEUTRAL"
-                    sma20 = df['Close'].rolling(20).mean().iloc[-1]
-                    close = df['Close'].iloc[-1]
-                    return "BULLISH_TREND" if close > sma20 else "BEARISH_TREND"
-
-                w_trend = get_trend(df_weekly)
-                m_trend = get_trend(df_monthly)
-
-                # Fetch Daily Data for context (last 60 days)
-                stock_daily = yf.Ticker(ticker)
-                df_daily = stock_daily.history(period="6mo", interval="1d")
-                df_daily = vsa_utils.prepare_vsa_features(df_daily)
-                
-                # Check Daily Confirmation (Micro-Test)
-                daily_conf = "NONE"
-                if len(df_daily) > 5:
-                    last_5_daily = df_daily.iloc[-5:]
-                    # Simple check: Any test/no supply bar in last 3 days?
-                    for i in range(-3, 0):
-                        row = last_5_daily.iloc[i]
-                        prev = last_5_daily.iloc[i-1]['Close']
-                        type_target = 'BULLISH' if "STOPPING" in weekly_seq.get('type', '') else 'BEARISH'
-                        if vsa_utils.identify_test_bar(row, prev, type=type_target):
-                            daily_conf = "TEST_OBSERVED"
-                            break
-
-                current_price = df_daily['Close'].iloc[-1]
-                
-                # Determine Priority
-                priority = "LOW"
-                w_status = weekly_seq.get('status', 'NONE') # CONFIRMED_STRONG/EARLY/WATCH
-                m_status = monthly_seq.get('status', 'NONE')
-                
-                is_w_confirmed = "CONFIRMED" in w_status
-                is_m_confirmed = "CONFIRMED" in m_status
-                
-                # Logic per Plan
-                if is_m_confirmed and is_w_confirmed:
-                    priority = "VERY_HIGH"
-                elif (is_m_confirmed and "WATCH" in w_status) or (is_m_confirmed and not is_w_confirmed):
-                    # Monthly confirmed but weekly just watching or none
-                     priority = "MEDIUM" # Downgraded slightly as we want weekly trigger
-                elif "BULLISH" in q_context and is_w_confirmed:
-                     priority = "HIGH"
-                elif is_w_confirmed:
-                     priority = "MEDIUM"
-                elif "WATCH" in w_status:
-                     priority = "LOW"
-
-                filtered_results[ticker] = {
-                    'reason': f"Weekly:{weekly_seq.get('type')} status:{w_status}",
-                    'ticker': ticker,
-                    
-                    # Context & Signals
-                    'quarterly_context': q_context,
-                    'monthly_context': m_trend,
-                    'weekly_context': w_trend,
-                    'monthly_signal': monthly_seq,
-                    'weekly_signal': weekly_seq,
-                    'daily_confirmation': daily_conf,
-                    'priority': priority,
-                    
-                    # Raw data for LLM
-                    'weekly_data': serialize_df(df_weekly),
-                    'monthly_data': serialize_df(df_monthly),
-                    'daily_data': serialize_df(df_daily, n=60),
-                    
-                    # For CSV direct output (Latest bar stats)
-                    'latest_weekly_clv': round(df_weekly['CLV'].iloc[-1], 2),
-                    'latest_weekly_relvol': round(df_weekly['RelVol'].iloc[-1], 2),
-                    'current_price': round(current_price, 2)
-                }
-
-
-        except Exception as e:
-            logging.error(f"Error processing {ticker}: {e}")
-            continue
-
-    # Save results
-    with open(OUTPUT_FILE, 'w') as f:
-        json.dump(filtered_results, f, indent=4)
-        
-    logging.info(f"Saved {len(filtered_results)} filtered tickers to {OUTPUT_FILE}")
+            breaker.record(True)
+            errors.pop(ticker, None)
+            screened.add(ticker)
+            if result:
+                filtered_results[ticker] = result
+
+        queue = failed
+        if not queue or abandoned:
+            break
+
+    for ticker in queue:
+        logging.error(f"Giving up on {ticker} after {retry_round} retries: {errors[ticker]}")
+    # Abandoned tickers were not given their retries: they neither succeed nor fail this run
+    for ticker in abandoned:
+        errors.pop(ticker, None)
+    # Prescreen-eliminated tickers were fetched successfully too, which resets their failure count
+    not_fetched = set(errors) | set(abandoned)
+    fetched = eliminated + [t for t in survivors if t not in not_fetched]
+    counted = fetch_guard.countable_failures(errors, provider_failed, len(tickers), breaker)
+    if len(counted) < len(errors):
+        logging.warning(f"Provider trouble this run: {len(errors) - len(counted)}/{len(errors)} failed tickers "
+                        f"are not counted toward the dead letter.")
+    newly_dead = fetch_guard.update_dead_letter(dead_letter, fetched, counted, datetime.now().strftime('%Y-%m-%d'))
+    fetch_guard.save_dead_letter(dead_letter)
+    if newly_dead:
+        logging.warning(f"Dead-lettered after {fetch_guard.DEAD_LETTER_AFTER} failed runs (skipped until reviewed): "
+                        f"{', '.join(newly_dead)}")
+    logging.info(fetch_guard.fetch_summary(len(tickers), fetched, errors, retried, len(skipped), breaker,
+                                           len(prescreen_errors), len(abandoned)))
+
+    save_volume_stats(volume_stats)
+
+    # Track setups across runs (first/last seen, transitions, expiry)
+    signal_lifecycle.update_lifecycle(filtered_results, screened)
+
+    peak_rss = vsa_utils.peak_rss_mb()
+    if peak_rss is not None:
+        logging.info(f"Peak RSS: {peak_rss:.1f} MB (low-memory mode {'on' if LOW_MEMORY else 'off'})")
+
+    return filtered_results, not errors and not abandoned
 
 if __name__ == "__main__":
-    process_tickers()
+    import argparse
+    parser = argparse.ArgumentParser(description="Scan tickers for VSA sequences.")
+    parser.add_argument('ticker_file', nargs='?', default=TICKER_FILE)
+    parser.add_argument('--list', action='append', metavar='NAME=PATH',
+                        help="Named ticker list (repeatable); each unique ticker is fetched once")
+    args = parser.parse_args()
+    if args.list:
+        try:
+            watchlists = parse_watchlists(args.list)
+        except ValueError as e:
+            parser.error(str(e))
+        process_watchlists(watchlists)
+    else:
+        process_tickers(args.ticker_file)
@@ -1,13 +1,24 @@
+import csv
+import io
+import itertools
 import json
 import os
 import logging
+import re
+import shutil
+import tempfile
 from datetime import datetime
 
+import signal_lifecycle
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 INPUT_FILE = 'vsa_results.json'
+# One result per line, written alongside INPUT_FILE so reports can stream
+RESULTS_JSONL = 'vsa_results.jsonl'
 REPORT_DIR = 'reports'
+REPORT_CSV_DATE = re.compile(r'REPORT_(\d{4}-\d{2}-\d{2})\.csv$')
 
 def load_results():
     if not os.path.exists(INPUT_FILE):
@@ -15,240 +26,504 @@ def load_results():
     with open(INPUT_FILE, 'r') as f:
         return json.load(f)
 
-def generate_markdown(results):
-    date_str = datetime.now().strftime('%Y-%m-%d')
-    report_lines = [f"# VSA Analysis Report - {date_str}", ""]
+def format_sequence_lines(sequences):
+    """Markdown bullets for scan_vsa_sequences output: anchor -> test1 -> test2."""
+    lines = []
+    for seq in sequences:
+        steps = [f"{seq.get('anchor_date')} {seq.get('type')}"]
+        steps += [f"Test {seq[key]}" for key in ('test1_date', 'test2_date') if seq.get(key)]
+        lines.append(f"- {' → '.join(steps)} ({seq.get('status')})")
+    return lines
+
+def lifecycle_lines(state, members=None):
+    """
+    'New today / upgraded / expired' section from the signal lifecycle store (empty if there is none).
+    'members' limits it to a watchlist's tickers.
+    """
+    if not state.get('last_run'):
+        return []
+    changes = signal_lifecycle.daily_changes(state)
+    if members is not None:
+        changes = {key: [e for e in entries if e['ticker'] in members] for key, entries in changes.items()}
+    lines = [f"## 🔄 Setup Lifecycle ({state['last_run']})"]
+    labels = {'new': "🆕 New", 'revived': "♻️ Revived", 'upgraded': "⬆️ Upgraded", 'downgraded': "⬇️ Downgraded", 'expired': "⌛ Expired"}
+    for key, label in labels.items():
+        entries = changes[key]
+        tickers = ", ".join(f"{e['ticker']} ({e['timeframe'][0].upper()} {e['status']})" for e in entries) or "-"
+        lines.append(f"- **{label} ({len(entries)}):** {tickers}")
+    lines += ["", "---"]
+    return lines
+
+# Report categories in output order: (key, section title)
+CATEGORIES = [
+    ("READY FOR ENTRY", "🚀 Ready for Entry"),
+    ("READY FOR EXIT", "⚠️ Ready for Exit"),
+    ("MONITORING", "👀 Watch/Monitoring"),
+    ("OTHER", "Other"),
+]
+
+CSV_HEADERS = [
+    "Ticker",
+    "Quarterly_Context",
+    "Monthly_Context",
+    "Weekly_Context",
+    "Monthly_Signal",
+    "Monthly_Anchor_Date",
+    "Monthly_Test1_Date",
+    "Monthly_Test2_Date",
+    "Weekly_Signal",
+    "Weekly_Anchor_Date",
+    "Weekly_Test1_Date",
+    "Weekly_Test2_Date",
+    "Daily_Confirmation",
+    "Verdict",
+    "Priority",
+    "Action",
+    "Entry_Trigger",
+    "Invalidation",
+    "Invalidation_Price",
+    "Key_Level_Support",
+    "Key_Level_Resistance",
+    "Weekly_CLV",
+    "Weekly_RelVol",
+    "Current_Price",
+    "Score",
+    "Weekly_Sequence_Count",
+    "Monthly_Sequence_Count",
+    "Weekly_Lifecycle",
+    "Weekly_Setup_Age_Days",
+    "Monthly_Lifecycle",
+    "Monthly_Setup_Age_Days"
+]
+
+LEGEND = """VSA SCREENER RESULTS - LEGEND
+-----------------------------
+CLV (Close Location Value): +1.0 (High Close) to -1.0 (Low Close). >0.5 Bullish, <-0.5 Bearish.
+RelVol (Relative Volume): Ratio vs 20SMA. >1.5 High, >2.0 Ultra High, <0.7 Low.
+PRIORITIES:
+  VERY_HIGH: Monthly Confirmed + Weekly Confirmed (Perfect Alignment)
+  HIGH: Monthly Confirmed + Weekly Stopping Volume (Sequence Early) OR Monthly Context + Weekly Confirmed
+  MEDIUM: Weekly Confirmed (No Monthly support) OR Monthly Confirmed (No Weekly support)
+  LOW: Watchlist only (Accumulation detected but no confirmation)
+ACTION:
+  ENTER_NOW: Confirmed Signal + Daily Trigger Met
+  WAIT_FOR_TEST: Anchor found, waiting for Test
+COLUMNS:
+  Anchor_Date: The date of the initial VSA signal. Types:
+     - STOPPING_VOLUME: Bullish Anchor (Down bar, High Vol, Close off lows)
+     - BUYING_CLIMAX: Bearish Anchor (Up bar, High Vol, Weak Close)
+     - SUPPLY_DOMINANCE: Bearish Anchor (Down bar, High Vol, Weak Close)
+  Test1/Test2_Date: The dates of subsequent confirmation bars (Tests) on the same timeframe.
+  Daily_Confirmation: 'TEST_OBSERVED' if a Test pattern appeared on the Daily chart in the last 5 days.
+  Score: Pre-ranking score (priority, sequence status, anchor RelVol/CLV, context alignment, daily confirmation).
+         Only top-scoring tickers are sent to the LLM; the rest are reported from algo signals only.
+  Weekly/Monthly_Sequence_Count: Number of Anchor -> Test sequences in the last 52 weeks / 24 months.
+  Weekly/Monthly_Lifecycle: NEW (first seen today), REVIVED (expired earlier, detected again today), UPGRADED/DOWNGRADED (status changed today), ONGOING.
+  Weekly/Monthly_Setup_Age_Days: Days since the setup (ticker, timeframe, anchor date) was first seen.
+DELTA_YYYY-MM-DD.csv (changes since the previous report):
+  NEW / DROPPED: Ticker entered / left the report. PRIORITY_CHANGE / ACTION_CHANGE: Previous -> Current.
+  INVALIDATED: Price moved through the previous report's Invalidation_Price.
+  Invalidation_Price: Numeric invalidation level (rule-based levels, or the only number in the LLM's
+         Invalidation text; empty when that text has none or several).
+"""
+
+def categorize(data):
+    """Report category for a result, based on its setup stage."""
+    stage = data.get("setup_stage", "Monitoring").upper()
+    if "ENTRY" in stage:
+        return "READY FOR ENTRY"
+    if "EXIT" in stage:
+        return "READY FOR EXIT"
+    if "MONITORING" in stage:
+        return "MONITORING"
+    return "OTHER"
+
+def summary_row(ticker, data):
+    """One row of the Markdown summary table."""
+    verdict = data.get('verdict', 'N/A')
+    stage = data.get('setup_stage', 'N/A')
+    pattern = data.get('vsa_status', 'N/A')
     
-    # Group by setup stage/verdict
-    # Categories: READY FOR ENTRY, MONITORING, EXIT, OTHER
-    categories = {
-        "READY FOR ENTRY": [],
-        "READY FOR EXIT": [],
-        "MONITORING": [],
-        "OTHER": []
-    }
+    # Combine trigger info for brevity
+    trigger = data.get('entry_trigger') or "Monitor"
+    # Truncate long trigger text for table
+    if len(trigger) > 50:
+        trigger = trigger[:47] + "..."
     
-    for ticker, data in results.items():
-        if "error" in data:
-            continue
-            
-        stage = data.get("setup_stage", "Monitoring").upper()
-        verdict = data.get("verdict", "NEUTRAL").upper()
-        
-        if "ENTRY" in stage:
-            categories["READY FOR ENTRY"].append((ticker, data))
-        elif "EXIT" in stage:
-            categories["READY FOR EXIT"].append((ticker, data))
-        elif "MONITORING" in stage:
-            categories["MONITORING"].append((ticker, data))
-        else:
-            categories["OTHER"].append((ticker, data))
-
-    # Sort categories for the summary table (Priority: Ready for Entry > Ready for Exit > Monitoring > Other)
-    summary_priority = []
-    summary_priority.extend(categories["READY FOR ENTRY"])
-    summary_priority.extend(categories["READY FOR EXIT"])
-    summary_priority.extend(categories["MONITORING"])
-    summary_priority.extend(categories["OTHER"])
+    # Add emoji based on verdict
+    verdict_icon = "🟢" if "BULL" in verdict.upper() else "🔴" if "BEAR" in verdict.upper() else "⚪"
+    
+    return f"| **{ticker}** | {verdict_icon} {verdict} | {pattern} | {stage} | {trigger} |"
+
+def detail_lines(ticker, data):
+    """The Markdown detail block for one ticker."""
+    lines = []
+    lines.append(f"### {ticker} ({data.get('verdict', 'N/A')})")
+    lines.append(f"**VSA Status:** {data.get('vsa_status', 'N/A')}")
+    lines.append(f"")
+    lines.append(f"**Smart Money Logic:**")
+    lines.append(f"{data.get('smart_money_logic', 'N/A')}")
+    lines.append(f"")
+    lines.append(f"**Key Levels:** {', '.join(data.get('key_levels', []) if isinstance(data.get('key_levels'), list) else [str(data.get('key_levels'))])}")
+    lines.append(f"")
+
+    # Full sequence structure from the long-lookback scan (if the filter provided it)
+    for timeframe in ('weekly', 'monthly'):
+        sequences = data.get(f'{timeframe}_sequences')
+        if sequences:
+            lines.append(f"**{timeframe.capitalize()} Sequence History:**")
+            lines.extend(format_sequence_lines(sequences))
+            lines.append(f"")
     
-    # Generate Summary Table
-    if summary_priority:
-        report_lines.append("## 📊 Summary Table")
-        report_lines.append("| Ticker | Verdict | Pattern (VSA) | Stage | Action |")
-        report_lines.append("| :--- | :--- | :--- | :--- | :--- |")
+    # Actionable info
+    lines.append(f"#### Action Plan")
+    lines.append(f"- **Entry Trigger:** {data.get('entry_trigger', 'N/A')}")
+    lines.append(f"- **Invalidation:** {data.get('invalidation_level', 'N/A')}")
+    lines.append(f"---")
+    return lines
+
+def fmt_sig(sig_dict):
+    """Signal string from dict, e.g. 'STOPPING_VOLUME_CONFIRMED_EARLY'."""
+    if not isinstance(sig_dict, dict): return str(sig_dict)
+    t = sig_dict.get('type')
+    s = sig_dict.get('status')
+    if not t: return "NONE"
+    return f"{t}_{s}"
+
+def determine_action(data):
+    """Action column: ENTER_NOW / ENTER_PENDING_DAILY / WAIT_FOR_TEST / MONITOR."""
+    w_status = data.get('weekly_signal', {}).get('status', '')
+    if "CONFIRMED" in w_status and data.get('daily_confirmation') == "TEST_OBSERVED":
+        return "ENTER_NOW"
+    elif "CONFIRMED" in w_status:
+        return "ENTER_PENDING_DAILY"
+    elif "WATCH" in w_status:
+        return "WAIT_FOR_TEST"
+    return "MONITOR"
+
+def csv_row(ticker, data):
+    """One CSV row (dict keyed by CSV_HEADERS) for a result."""
+    # Parse Monthly/Weekly Signals (which might be dicts or strings depending on source)
+    # From filter_tickers, they are dicts: {'type':..., 'status':..., 'anchor_date':...}
+    m_sig = data.get('monthly_signal', {})
+    w_sig = data.get('weekly_signal', {})
+
+    return {
+        "Ticker": ticker,
+        "Quarterly_Context": data.get('quarterly_context', 'N/A'),
+        "Monthly_Context": data.get('monthly_context', 'N/A'),
+        
+        "Monthly_Signal": fmt_sig(m_sig),
+        "Monthly_Anchor_Date": m_sig.get('anchor_date', ''),
+        "Monthly_Test1_Date": m_sig.get('test1_date', ''),
+        "Monthly_Test2_Date": m_sig.get('test2_date', ''),
+        
+        "Weekly_Context": data.get('weekly_context', 'N/A'),
+        "Weekly_Signal": fmt_sig(w_sig),
+        "Weekly_Anchor_Date": w_sig.get('anchor_date', ''),
+        "Weekly_Test1_Date": w_sig.get('test1_date', ''),
+        "Weekly_Test2_Date": w_sig.get('test2_date', ''),
+        
+        "Daily_Confirmation": data.get('daily_confirmation', 'NONE'),
         
-        for ticker, data in summary_priority:
-            verdict = data.get('verdict', 'N/A')
-            stage = data.get('setup_stage', 'N/A')
-            pattern = data.get('vsa_status', 'N/A')
-            
-            # Combine trigger info for brevity
-            trigger = data.get('entry_trigger') or "Monitor"
-            # Truncate long trigger text for table
-            if len(trigger) > 50:
-                trigger = trigger[:47] + "..."
-            
-            # Add emoji based on verdict
-            verdict_icon = "🟢" if "BULL" in verdict.upper() else "🔴" if "BEAR" in verdict.upper() else "⚪"
-            
-            report_lines.append(f"| **{ticker}** | {verdict_icon} {verdict} | {pattern} | {stage} | {trigger} |")
+        "Verdict": data.get('verdict', 'NEUTRAL'),
+        "Priority": data.get('priority', 'LOW'),
+        "Action": determine_action(data),
         
-        report_lines.append("")
-        report_lines.append("---")
-
-    # Helper function to write a section
-    def write_section(title, items):
-        if not items:
-            return
-        report_lines.append(f"## {title}")
+        "Entry_Trigger": data.get('entry_trigger', ''),
+        "Invalidation": data.get('invalidation_level', ''),
+        "Invalidation_Price": invalidation_price(data),
+        
+        # Key levels is a list usually
+        "Key_Level_Support": (data.get('key_levels', []) + [''])[0] if isinstance(data.get('key_levels'), list) and data.get('key_levels') else '',
+        "Key_Level_Resistance": (data.get('key_levels', []) + ['',''])[1] if isinstance(data.get('key_levels'), list) and len(data.get('key_levels', []))>1 else '',
+        
+        "Weekly_CLV": data.get('latest_weekly_clv', ''),
+        "Weekly_RelVol": data.get('latest_weekly_relvol', ''),
+        "Current_Price": data.get('current_price', ''),
+        "Score": data.get('score', ''),
+        "Weekly_Sequence_Count": len(data['weekly_sequences']) if 'weekly_sequences' in data else '',
+        "Monthly_Sequence_Count": len(data['monthly_sequences']) if 'monthly_sequences' in data else '',
+        "Weekly_Lifecycle": data.get('lifecycle', {}).get('weekly', {}).get('change', ''),
+        "Weekly_Setup_Age_Days": data.get('lifecycle', {}).get('weekly', {}).get('age_days', ''),
+        "Monthly_Lifecycle": data.get('lifecycle', {}).get('monthly', {}).get('change', ''),
+        "Monthly_Setup_Age_Days": data.get('lifecycle', {}).get('monthly', {}).get('age_days', '')
+    }
+
+DELTA_HEADERS = ["Ticker", "Change", "Previous", "Current", "Current_Price"]
+# Delta change types in report order: (change, Markdown label)
+DELTA_CHANGES = [
+    ("NEW", "🆕 New"),
+    ("DROPPED", "➖ Dropped"),
+    ("PRIORITY_CHANGE", "🔀 Priority Changed"),
+    ("ACTION_CHANGE", "🎯 Action Changed"),
+    ("INVALIDATED", "❌ Invalidated"),
+]
+# Previous-report columns kept in the delta index
+INDEX_COLUMNS = ("Priority", "Action", "Verdict", "Invalidation", "Invalidation_Price", "Current_Price")
+LEVEL_NUMBER = re.compile(r'\d[\d,]*(?:\.\d+)?')
+
+def previous_report(date_str, report_dir=REPORT_DIR):
+    """(date, path) of the latest report CSV dated before date_str, or (None, None)."""
+    dated = []
+    if os.path.isdir(report_dir):
+        for name in os.listdir(report_dir):
+            match = REPORT_CSV_DATE.match(name)
+            if match and match.group(1) < date_str:
+                dated.append((match.group(1), os.path.join(report_dir, name)))
+    return max(dated) if dated else (None, None)
+
+def load_report_index(path):
+    """{ticker: (Priority, Action, Verdict, Invalidation, Invalidation_Price, Current_Price)} from a report CSV."""
+    index = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            index[row['Ticker']] = tuple(row.get(col, '') for col in INDEX_COLUMNS)
+    return index
+
+def parse_price(value):
+    try:
+        return float(str(value).replace(',', ''))
+    except ValueError:
+        return None
+
+def single_level(text):
+    """The number in a free-form level text, or None unless there is exactly one (dates, '20-week low at 45.10')."""
+    numbers = LEVEL_NUMBER.findall(text or '')
+    return parse_price(numbers[0]) if len(numbers) == 1 else None
+
+def invalidation_price(data):
+    """Numeric invalidation level of a result: the rule-based one, else the only number in the text, else ''."""
+    level = data.get('invalidation_price')
+    if level is None:
+        level = single_level(data.get('invalidation_level'))
+    return '' if level is None else level
+
+def invalidation_crossed(invalidation, level, verdict, prev_price, price):
+    """
+    True if price moved through the invalidation level since the previous report. The level is the
+    report's Invalidation_Price (reports without that column: the only number in the text, if any).
+    'above' in the text means a short is invalidated on the way up, otherwise (or for bullish setups
+    without a keyword) a close below the level invalidates.
+    """
+    level = parse_price(level) if level != '' else single_level(invalidation)
+    price = parse_price(price)
+    if level is None or price is None:
+        return False
+    text = (invalidation or '').lower()
+    upward = 'above' in text or ('below' not in text and 'BEAR' in (verdict or '').upper())
+
+    def beyond(p):
+        return p > level if upward else p < level
+
+    prev_price = parse_price(prev_price)
+    return beyond(price) and (prev_price is None or not beyond(prev_price))
+
+def delta_rows(ticker, row, previous):
+    """Delta CSV rows for one of today's results against the previous report index."""
+    price = row['Current_Price']
+    if ticker not in previous:
+        return [[ticker, "NEW", "", f"{row['Priority']} {row['Action']}", price]]
+    prev_priority, prev_action, prev_verdict, prev_invalidation, prev_level, prev_price = previous[ticker]
+    changes = []
+    if prev_priority != row['Priority']:
+        changes.append([ticker, "PRIORITY_CHANGE", prev_priority, row['Priority'], price])
+    if prev_action != row['Action']:
+        changes.append([ticker, "ACTION_CHANGE", prev_action, row['Action'], price])
+    if invalidation_crossed(prev_invalidation, prev_level, prev_verdict, prev_price, price):
+        changes.append([ticker, "INVALIDATED", prev_invalidation, price, price])
+    return changes
+
+def delta_lines(previous_date, changes):
+    """Compact 'what changed since the previous report' Markdown section."""
+    lines = [f"## 🔁 Changes Since {previous_date}"]
+    for change, label in DELTA_CHANGES:
+        entries = [c for c in changes if c[1] == change]
+        if change in ("NEW", "DROPPED"):
+            items = [f"{c[0]} ({c[3] or c[2]})" for c in entries]
+        elif change == "INVALIDATED":
+            items = [f"{c[0]} @ {c[4]}" for c in entries]
+        else:
+            items = [f"{c[0]} {c[2]} → {c[3]}" for c in entries]
+        lines.append(f"- **{label} ({len(entries)}):** {', '.join(items) or '-'}")
+    lines += ["", "---"]
+    return lines
+
+def write_reports(items, md_out=None, csv_out=None, date_str=None, previous=None, delta_out=None,
+                  watchlist=None, members=None):
+    """
+    Single pass over (ticker, data) items: CSV rows are written as they arrive, each ticker's
+    Markdown detail block is spooled to a per-category temp file, and only the short summary-table
+    row is kept in memory. The Markdown is then assembled as title, lifecycle, delta, summary, sections.
+    md_out / csv_out / delta_out are open text files (any may be None). 'previous' is a
+    (date, load_report_index) pair for the delta. A watchlist name is added to the title and
+    its tickers ('members') scope the lifecycle section. Returns the number of results written.
+    """
+    date_str = date_str or datetime.now().strftime('%Y-%m-%d')
+    summary = {key: [] for key, _ in CATEGORIES}
+    spools = {key: tempfile.TemporaryFile('w+', encoding='utf-8') for key, _ in CATEGORIES} if md_out else {}
+
+    writer = None
+    if csv_out:
+        writer = csv.DictWriter(csv_out, fieldnames=CSV_HEADERS, lineterminator='\n')
+        writer.writeheader()
+
+    previous_date, previous_index = previous or (None, None)
+    changes, seen = [], set()
+
+    count = 0
+    try:
         for ticker, data in items:
-            report_lines.append(f"### {ticker} ({data.get('verdict', 'N/A')})")
-            report_lines.append(f"**VSA Status:** {data.get('vsa_status', 'N/A')}")
-            report_lines.append(f"")
-            report_lines.append(f"**Smart Money Logic:**")
-            report_lines.append(f"{data.get('smart_money_logic', 'N/A')}")
-            report_lines.append(f"")
-            report_lines.append(f"**Key Levels:** {', '.join(data.get('key_levels', []) if isinstance(data.get('key_levels'), list) else [str(data.get('key_levels'))])}")
-            report_lines.append(f"")
-            
-            # Actionable info
-            report_lines.append(f"#### Action Plan")
-            report_lines.append(f"- **Entry Trigger:** {data.get('entry_trigger', 'N/A')}")
-            report_lines.append(f"- **Invalidation:** {data.get('invalidation_level', 'N/A')}")
-            report_lines.append(f"---")
-
-    write_section("🚀 Ready for Entry", categories["READY FOR ENTRY"])
-    write_section("⚠️ Ready for Exit", categories["READY FOR EXIT"])
-    write_section("👀 Watch/Monitoring", categories["MONITORING"])
-    write_section("Other", categories["OTHER"])
-    
-    return "\n".join(report_lines)
+            if "error" in data:
+                continue
+            count += 1
+            row = csv_row(ticker, data)
+            if writer:
+                writer.writerow(row)
+            if previous_index is not None:
+                seen.add(ticker)
+                changes.extend(delta_rows(ticker, row, previous_index))
+            if md_out:
+                category = categorize(data)
+                summary[category].append(summary_row(ticker, data))
+                # Lines are joined with newline separators (no trailing newline at the end of the report)
+                spools[category].write("\n" + "\n".join(detail_lines(ticker, data)))
 
-def generate_csv(results):
-    import csv
-    import io
-    
+        if previous_index is not None:
+            for ticker, (prev_priority, prev_action, _, _, _, prev_price) in previous_index.items():
+                if ticker not in seen:
+                    changes.append([ticker, "DROPPED", f"{prev_priority} {prev_action}", "", prev_price])
+            if delta_out:
+                delta_writer = csv.writer(delta_out, lineterminator='\n')
+                delta_writer.writerow(DELTA_HEADERS)
+                delta_writer.writerows(changes)
+
+        if md_out:
+            title = f"# VSA Analysis Report - {date_str}" + (f" ({watchlist})" if watchlist else "")
+            header = [title, ""]
+            header.extend(lifecycle_lines(signal_lifecycle.load_state(), members))
+            if previous_index is not None:
+                header.extend(delta_lines(previous_date, changes))
+            md_out.write("\n".join(header))
+
+            # Summary table (Priority: Ready for Entry > Ready for Exit > Monitoring > Other)
+            if count:
+                md_out.write("\n## 📊 Summary Table")
+                md_out.write("\n| Ticker | Verdict | Pattern (VSA) | Stage | Action |")
+                md_out.write("\n| :--- | :--- | :--- | :--- | :--- |")
+                for key, _ in CATEGORIES:
+                    for row in summary[key]:
+                        md_out.write("\n" + row)
+                md_out.write("\n\n---")
+
+            for key, title in CATEGORIES:
+                if not summary[key]:
+                    continue
+                md_out.write(f"\n## {title}")
+                spools[key].seek(0)
+                shutil.copyfileobj(spools[key], md_out)
+    finally:
+        for spool in spools.values():
+            spool.close()
+    return count
+
+def generate_markdown(results):
     output = io.StringIO()
-    
-    
-    # Write Legend to separate file
+    write_reports(results.items(), md_out=output)
+    return output.getvalue()
+
+def write_legend():
+    """Writes REPORT_LEGEND.txt only when its content changed."""
     legend_path = f"{REPORT_DIR}/REPORT_LEGEND.txt"
+    if os.path.exists(legend_path):
+        with open(legend_path, 'r') as f:
+            if f.read() == LEGEND:
+                return
     with open(legend_path, 'w') as f:
-        f.write("VSA SCREENER RESULTS - LEGEND\n")
-        f.write("-----------------------------\n")
-        f.write("CLV (Close Location Value): +1.0 (High Close) to -1.0 (Low Close). >0.5 Bullish, <-0.5 Bearish.\n")
-        f.write("RelVol (Relative Volume): Ratio vs 20SMA. >1.5 High, >2.0 Ultra High, <0.7 Low.\n")
-        f.write("PRIORITIES:\n")
-        f.write("  VERY_HIGH: Monthly Confirmed + Weekly Confirmed (Perfect Alignment)\n")
-        f.write("  HIGH: Monthly Confirmed + Weekly Stopping Volume (Sequence Early) OR Monthly Context + Weekly Confirmed\n")
-        f.write("  MEDIUM: Weekly Confirmed (No Monthly support) OR Monthly Confirmed (No Weekly support)\n")
-        f.write("  LOW: Watchlist only (Accumulation detected but no confirmation)\n")
-        f.write("ACTION:\n")
-        f.write("  ENTER_NOW: Confirmed Signal + Daily Trigger Met\n")
-        f.write("  WAIT_FOR_TEST: Anchor found, waiting for Test\n")
-        f.write("COLUMNS:\n")
-        f.write("  Anchor_Date: The date of the initial VSA signal. Types:\n")
-        f.write("     - STOPPING_VOLUME: Bullish Anchor (Down bar, High Vol, Close off lows)\n")
-        f.write("     - BUYING_CLIMAX: Bearish Anchor (Up bar, High Vol, Weak Close)\n")
-        f.write("     - SUPPLY_DOMINANCE: Bearish Anchor (Down bar, High Vol, Weak Close)\n")
-        f.write("  Test1/Test2_Date: The dates of subsequent confirmation bars (Tests) on the same timeframe.\n")
-        f.write("  Daily_Confirmation: 'TEST_OBSERVED' if a Test pattern appeared on the Daily chart in the last 5 days.\n")
-    
-    headers = [
-        "Ticker",
-        "Quarterly_Context",
-        "Monthly_Context",
-        "Weekly_Context",
-        "Monthly_Signal",
-        "Monthly_Anchor_Date",
-        "Monthly_Test1_Date",
-        "Monthly_Test2_Date",
-        "Weekly_Signal",
-        "Weekly_Anchor_Date",
-        "Weekly_Test1_Date",
-        "Weekly_Test2_Date",
-        "Daily_Confirmation",
-        "Verdict",
-        "Priority",
-        "Action",
-        "Entry_Trigger",
-        "Invalidation",
-        "Key_Level_Support",
-        "Key_Level_Resistance",
-        "Weekly_CLV",
-        "Weekly_RelVol",
-        "Current_Price"
-    ]
-    
-    writer = csv.DictWriter(output, fieldnames=headers, lineterminator='\n')
-    writer.writeheader()
-    
-    for ticker, data in results.items():
-        if "error" in data:
-            continue
-            
-        # Parse Monthly/Weekly Signals (which might be dicts or strings depending on source)
-        # From filter_tickers, they are dicts: {'type':..., 'status':..., 'anchor_date':...}
-        m_sig = data.get('monthly_signal', {})
-        w_sig = data.get('weekly_signal', {})
-        
-        # Helper to format signal string from dict
-        def fmt_sig(sig_dict):
-            if not isinstance(sig_dict, dict): return str(sig_dict)
-            t = sig_dict.get('type')
-            s = sig_dict.get('status')
-            if not t: return "NONE"
-            return f"{t}_{s}"
-
-        # Determine Action
-        action = "MONITOR"
-        w_status = w_sig.get('status', '')
-        if "CONFIRMED" in w_status and data.get('daily_confirmation') == "TEST_OBSERVED":
-            action = "ENTER_NOW"
-        elif "CONFIRMED" in w_status:
-            action = "ENTER_PENDING_DAILY"
-        elif "WATCH" in w_status:
-            action = "WAIT_FOR_TEST"
-
-        row = {
-            "Ticker": ticker,
-            "Quarterly_Context": data.get('quarterly_context', 'N/A'),
-            "Monthly_Context": data.get('monthly_context', 'N/A'),
-            
-            "Monthly_Signal": fmt_sig(m_sig),
-            "Monthly_Anchor_Date": m_sig.get('anchor_date', ''),
-            "Monthly_Test1_Date": m_sig.get('test1_date', ''),
-            "Monthly_Test2_Date": m_sig.get('test2_date', ''),
-            
-            "Weekly_Context": data.get('weekly_context', 'N/A'),
-            "Weekly_Signal": fmt_sig(w_sig),
-            "Weekly_Anchor_Date": w_sig.get('anchor_date', ''),
-            "Weekly_Test1_Date": w_sig.get('test1_date', ''),
-            "Weekly_Test2_Date": w_sig.get('test2_date', ''),
-            
-            "Daily_Confirmation": data.get('daily_confirmation', 'NONE'),
-            
-            "Verdict": data.get('verdict', 'NEUTRAL'),
-            "Priority": data.get('priority', 'LOW'),
-            "Action": action,
-            
-            "Entry_Trigger": data.get('entry_trigger', ''),
-            "Invalidation": data.get('invalidation_level', ''),
-            
-            # Key levels is a list usually
-            "Key_Level_Support": (data.get('key_levels', []) + [''])[0] if isinstance(data.get('key_levels'), list) and data.get('key_levels') else '',
-            "Key_Level_Resistance": (data.get('key_levels', []) + ['',''])[1] if isinstance(data.get('key_levels'), list) and len(data.get('key_levels', []))>1 else '',
-            
-            "Weekly_CLV": data.get('latest_weekly_clv', ''),
-            "Weekly_RelVol": data.get('latest_weekly_relvol', ''),
-            "Current_Price": data.get('current_price', '')
-        }
-        writer.writerow(row)
-        
+        f.write(LEGEND)
+
+def generate_csv(results):
+    output = io.StringIO()
+    write_legend()
+    write_reports(results.items(), csv_out=output)
     return output.getvalue()
 
-def save_report():
-    results = load_results()
-    if not results:
-        logging.info("No results to report.")
+def iter_results():
+    """
+    Streams (ticker, data) results: line by line from RESULTS_JSONL when it is at least as new
+    as INPUT_FILE, otherwise from the full INPUT_FILE JSON.
+    """
+    if os.path.exists(RESULTS_JSONL) and (
+        not os.path.exists(INPUT_FILE) or os.path.getmtime(RESULTS_JSONL) >= os.path.getmtime(INPUT_FILE)
+    ):
+        with open(RESULTS_JSONL, 'r') as f:
+            for line in f:
+                if line.strip():
+                    data = json.loads(line)
+                    yield data['ticker'], data
         return
-        
-    report_content = generate_markdown(results)
+    yield from load_results().items()
+
+def save_report(results=None, report_dir=REPORT_DIR, watchlist=None, members=None):
+    """
+    Writes the Markdown and CSV reports for the results (streamed from disk unless passed in)
+    into report_dir. watchlist/members name a per-list report and limit it to the list's tickers.
+    """
+    items = iter(results.items()) if results is not None else iter_results()
+    if members is not None:
+        items = ((ticker, data) for ticker, data in items if ticker in members)
+    first = next(items, None)
+    if first is None:
+        logging.info(f"No results to report{f' for {watchlist}' if watchlist else ''}.")
+        return []
     
-    if not os.path.exists(REPORT_DIR):
-        os.makedirs(REPORT_DIR)
-        
-    filename = f"{REPORT_DIR}/REPORT_{datetime.now().strftime('%Y-%m-%d')}.md"
-    with open(filename, 'w', encoding='utf-8') as f:
-        f.write(report_content)
+    os.makedirs(report_dir, exist_ok=True)
+    write_legend()
         
-    # NEW: Generate CSV
-    csv_content = generate_csv(results)
-    csv_filename = f"{REPORT_DIR}/REPORT_{datetime.now().strftime('%Y-%m-%d')}.csv"
-    with open(csv_filename, 'w', encoding='utf-8') as f:
-        f.write(csv_content)
+    date_str = datetime.now().strftime('%Y-%m-%d')
+    filename = f"{report_dir}/REPORT_{date_str}.md"
+    csv_filename = f"{report_dir}/REPORT_{date_str}.csv"
+    files = [filename, csv_filename]
+
+    # Day-over-day delta against the most recent earlier report, if there is one
+    previous_date, previous_path = previous_report(date_str, report_dir)
+    previous = (previous_date, load_report_index(previous_path)) if previous_path else None
+    delta_filename = f"{report_dir}/DELTA_{date_str}.csv"
+
+    with open(filename, 'w', encoding='utf-8') as md_out, open(csv_filename, 'w', encoding='utf-8') as csv_out, \
+            (open(delta_filename, 'w', encoding='utf-8') if previous else io.StringIO()) as delta_out:
+        count = write_reports(itertools.chain([first], items), md_out, csv_out, date_str, previous, delta_out,
+                              watchlist, members)
         
-    logging.info(f"Report generated: {filename} and {csv_filename}")
+    logging.info(f"Report generated for {count} tickers: {filename} and {csv_filename}")
+    if previous:
+        logging.info(f"Delta against {os.path.basename(previous_path)}: {delta_filename}")
+        files.append(delta_filename)
+    return files
+
+def save_watchlist_reports(results, watchlists):
+    """
+    For {name: [tickers]}: the combined report in reports/ (read by the monitor, query API and
+    dashboard) plus one report per list in reports/<name>/. Without results in memory, each report
+    streams the results from disk again. Returns every file written.
+    """
+    files = save_report(results)
+    for name, tickers in watchlists.items():
+        files += save_report(results, os.path.join(REPORT_DIR, name), name, set(tickers))
+    return files
 
 if __name__ == "__main__":
-    save_report()
+    import argparse
+    parser = argparse.ArgumentParser(description="Generate the Markdown and CSV reports from vsa_results.")
+    parser.add_argument('--list', action='append', metavar='NAME=PATH',
+                        help="Named ticker list (repeatable); also writes one report per list in reports/<name>/")
+    args = parser.parse_args()
+    if args.list:
+        import filter_tickers
+        try:
+            watchlists = filter_tickers.parse_watchlists(args.list)
+        except ValueError as e:
+            parser.error(str(e))
+        save_watchlist_reports(None, {name: filter_tickers.load_tickers(path) for name, path in watchlists.items()})
+    else:
+        save_report()
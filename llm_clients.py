@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+
+# LLM backend used by analyze_vsa: 'gemini' (needs GEMINI_API_KEY), 'fake' (in-process stand-in,
+# no quota) or 'fake-http' (the same stand-in behind a local HTTP server, called through
+# GeminiClient and the Gemini SDK, so SDK errors and 429 handling are exercised too)
+LLM_BACKEND = os.environ.get("VSA_LLM_BACKEND", "gemini")
+MODEL_ID = 'gemini-flash-latest' # Maps to 1.5 Flash usually
+# Gemini API endpoint override, e.g. http://127.0.0.1:8766 for `python llm_clients.py --serve`
+GEMINI_ENDPOINT = os.environ.get("VSA_GEMINI_ENDPOINT")
+FAKE_SERVER_PORT = 8766
+
+# Fake backend behaviour (probabilities are per call, except the drop rate which is per ticker)
+FAKE_LATENCY = float(os.environ.get("VSA_FAKE_LLM_LATENCY", "0.5"))
+FAKE_RATE_LIMIT = float(os.environ.get("VSA_FAKE_LLM_429_RATE", "0"))
+FAKE_MALFORMED = float(os.environ.get("VSA_FAKE_LLM_MALFORMED_RATE", "0"))
+FAKE_DROP = float(os.environ.get("VSA_FAKE_LLM_DROP_RATE", "0"))
+FAKE_SEED = int(os.environ.get("VSA_FAKE_LLM_SEED", "0"))
+
+# Every client exposes generate(prompt) -> response text and raises on API errors;
+# rate limiting must surface as an exception whose message contains "429".
+
+class GeminiClient:
+    def __init__(self, api_key, model_id=MODEL_ID, endpoint=GEMINI_ENDPOINT):
+        import google.generativeai as genai
+        if endpoint:
+            # The SDK's REST transport accepts a custom (also plain http) endpoint
+            genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": endpoint})
+        else:
+            genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_id)
+
+    def generate(self, prompt):
+        return self.model.generate_content(prompt).text
+
+class FakeLLMClient:
+    """
+    Local stand-in for Gemini: answers the batch prompt built by analyze_vsa with schema-valid
+    per-ticker JSON after a fixed latency, and injects 429s, malformed responses and dropped
+    tickers at the configured rates. The dice for a call depend only on the seed, the prompt and how
+    often that prompt was sent before, so runs are reproducible even with concurrent batches.
+    """
+
+    def __init__(self, latency=FAKE_LATENCY, rate_limit=FAKE_RATE_LIMIT, malformed=FAKE_MALFORMED,
+                 drop=FAKE_DROP, seed=FAKE_SEED):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.malformed = malformed
+        self.drop = drop
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.sent = {}
+        self.stats = {'calls': 0, 'rate_limited': 0, 'malformed': 0, 'dropped': 0, 'tickers': 0}
+
+    def _count(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+
+    def generate(self, prompt):
+        digest = hashlib.sha1(prompt.encode('utf-8')).hexdigest()
+        with self.lock:
+            self.stats['calls'] += 1
+            attempt = self.sent[digest] = self.sent.get(digest, 0) + 1
+        rng = random.Random(f"{self.seed}|{digest}|{attempt}")
+
+        time.sleep(self.latency)
+        if rng.random() < self.rate_limit:
+            self._count('rate_limited')
+            raise RuntimeError("429 RESOURCE_EXHAUSTED: Quota exceeded (fake backend)")
+        if rng.random() < self.malformed:
+            self._count('malformed')
+            return '```json\n[{"ticker": "TRUNCATED", "verdict": "BULL'
+
+        results = []
+        for ticker, reason in re.findall(r"--- Ticker: (\S+) ---\nAlgo Detection: (.*)", prompt):
+            if rng.random() < self.drop:
+                self._count('dropped')
+                continue
+            bullish = 'STOPPING' in reason
+            results.append({
+                "ticker": ticker,
+                "vsa_status": "Stopping Volume" if bullish else "Buying Climax",
+                "verdict": "BULLISH" if bullish else "BEARISH",
+                "smart_money_logic": f"Fake analysis of {reason}.",
+                "key_levels": [],
+                "setup_stage": "Monitoring",
+                "entry_trigger": "",
+                "invalidation_level": "",
+            })
+        self._count('tickers', len(results))
+        return json.dumps(results)
+
+class FakeGeminiServer:
+    """
+    Local HTTP stand-in for the Gemini REST API: answers POST /v1beta/models/<model>:generateContent
+    with a FakeLLMClient, and turns its injected rate limits into HTTP 429 RESOURCE_EXHAUSTED
+    errors, which the SDK raises as its own exception types.
+    """
+
+    def __init__(self, fake=None, port=0):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        self.fake = fake or FakeLLMClient()
+        fake_client = self.fake
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if ':generateContent' not in self.path:
+                    return self.reply(404, {"error": {"code": 404, "message": f"Unknown method {self.path}", "status": "NOT_FOUND"}})
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                prompt = "".join(part.get('text', '') for content in body.get('contents', [])
+                                 for part in content.get('parts', []))
+                try:
+                    text = fake_client.generate(prompt)
+                except RuntimeError as e:
+                    return self.reply(429, {"error": {"code": 429, "message": str(e), "status": "RESOURCE_EXHAUSTED"}})
+                self.reply(200, {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"},
+                                                 "finishReason": "STOP", "index": 0}]})
+
+            def reply(self, status, payload):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.httpd.daemon_threads = True
+        self.endpoint = f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def start(self):
+        """Serves in a daemon thread; returns self."""
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def get_client(backend=LLM_BACKEND):
+    """LLM client for the configured backend, or None if it cannot be used (no API key for Gemini)."""
+    if backend == 'fake':
+        return FakeLLMClient()
+    if backend == 'fake-http':
+        server = FakeGeminiServer().start()
+        return GeminiClient("fake-key", endpoint=server.endpoint)
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        return None
+    return GeminiClient(api_key)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the fake Gemini API server (configured by the VSA_FAKE_LLM_* settings).")
+    parser.add_argument('--port', type=int, default=FAKE_SERVER_PORT)
+    args = parser.parse_args()
+    server = FakeGeminiServer(port=args.port)
+    print(f"Fake Gemini API on {server.endpoint} (set VSA_GEMINI_ENDPOINT={server.endpoint} to use it)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
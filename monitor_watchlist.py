@@ -0,0 +1,221 @@
+import argparse
+import csv
+import glob
+import json
+import logging
+import os
+import sys
+import time
+import urllib.request
+from datetime import datetime
+
+import pandas as pd
+import yfinance as yf
+
+import vsa_utils
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+REPORT_DIR = 'reports'
+SMA_PERIOD = 20
+
+# Report actions that are waiting for a confirming Test bar, and the timeframe that confirms them
+WATCHED_ACTIONS = {
+    'WAIT_FOR_TEST': '1wk',        # Weekly anchor found, waiting for the weekly Test
+    'ENTER_PENDING_DAILY': '1d',   # Weekly confirmed, waiting for the daily Test
+}
+# (baseline history fetched once, recent window fetched on every poll)
+PERIODS = {
+    '1d': ('3mo', '5d'),
+    '1wk': ('1y', '1mo'),
+}
+
+# US regular session, used to project the volume of a still-forming bar
+SESSION_OPEN = (9, 30)
+SESSION_MINUTES = 390
+
+def latest_report(report_dir=REPORT_DIR):
+    """Path of the most recent REPORT_YYYY-MM-DD.csv (by date in the filename), or None."""
+    csv_files = glob.glob(os.path.join(report_dir, "REPORT_*.csv"))
+    return max(csv_files) if csv_files else None
+
+def load_active_setups(report_path):
+    """Pending setups from a report CSV: {ticker: setup} for rows whose Action is in WATCHED_ACTIONS."""
+    setups = {}
+    with open(report_path, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            action = row.get('Action')
+            if action not in WATCHED_ACTIONS:
+                continue
+            signal = row.get('Weekly_Signal', '')
+            setups[row['Ticker']] = {
+                'ticker': row['Ticker'],
+                'action': action,
+                'interval': WATCHED_ACTIONS[action],
+                'signal': signal,
+                'type': 'BULLISH' if 'STOPPING' in signal else 'BEARISH',
+                'anchor_date': row.get('Weekly_Anchor_Date', ''),
+            }
+    return setups
+
+def fetch_history(ticker, period, interval):
+    """
+    Fresh (uncached) price history. Deliberately not filter_tickers.fetch_history:
+    that module installs a 1-hour HTTP cache, which would hide intraday updates.
+    """
+    return yf.Ticker(ticker).history(period=period, interval=interval).dropna()
+
+def session_fraction(bar_start, now, interval):
+    """
+    Fraction of the bar's trading time that has elapsed (1.0 for completed bars).
+    A partial bar's raw volume is always 'low', so without projecting it every
+    forming bar would look like a low-volume Test.
+    """
+    open_time = now.normalize() + pd.Timedelta(hours=SESSION_OPEN[0], minutes=SESSION_OPEN[1])
+    day_fraction = min(max((now - open_time).total_seconds() / 60, 1), SESSION_MINUTES) / SESSION_MINUTES
+    if now.weekday() >= 5:
+        day_fraction = 1.0
+
+    if interval == '1d':
+        return day_fraction if bar_start.normalize() == now.normalize() else 1.0
+
+    # Weekly bar: completed weekdays plus today's fraction, out of 5
+    days_elapsed = (now.normalize() - bar_start.normalize()).days
+    if days_elapsed >= 7 or days_elapsed < 0:
+        return 1.0
+    return min(min(days_elapsed, 5) + (day_fraction if now.weekday() < 5 else 0), 5) / 5
+
+def merge_bars(history, recent):
+    """Appends new bars and replaces the still-forming ones with the freshly fetched values."""
+    if history is None or history.empty:
+        return recent
+    merged = pd.concat([history[~history.index.isin(recent.index)], recent]).sort_index()
+    # Only the SMA window (plus the previous close) is needed to evaluate the latest bar
+    return merged.tail(SMA_PERIOD + 2)
+
+def evaluate_latest_bar(bars, setup, now):
+    """
+    Incremental check: computes VSA features over the short tail only and tests the most recent bar.
+    Returns an alert dict if it is a confirming Test (or No Demand) bar, else None.
+    """
+    if len(bars) < SMA_PERIOD + 1:
+        return None
+    last_date = bars.index[-1]
+    if setup['anchor_date'] and last_date.strftime('%Y-%m-%d') <= setup['anchor_date']:
+        return None  # The test must come after the anchor
+
+    df = bars[['Open', 'High', 'Low', 'Close', 'Volume']].astype('float64')
+    fraction = session_fraction(last_date, now, setup['interval'])
+    if fraction < 1.0:
+        df.iloc[-1, df.columns.get_loc('Volume')] /= fraction
+    df = vsa_utils.prepare_vsa_features(df, SMA_PERIOD)
+
+    row = df.iloc[-1]
+    prev_close = df['Close'].iloc[-2]
+    if not vsa_utils.identify_test_bar(row, prev_close, type=setup['type']):
+        return None
+
+    return {
+        'ticker': setup['ticker'],
+        'action': setup['action'],
+        'signal': setup['signal'],
+        'timeframe': 'weekly' if setup['interval'] == '1wk' else 'daily',
+        'bar_date': last_date.strftime('%Y-%m-%d'),
+        'bar_complete': fraction >= 1.0,
+        'close': round(float(row['Close']), 2),
+        'relvol': round(float(row['RelVol']), 2),
+        'clv': round(float(row['CLV']), 2),
+        'detected_at': datetime.now().isoformat(timespec='seconds'),
+    }
+
+def emit_alert(alert, alert_file=None, webhook=None):
+    """Sends an alert to stdout, and optionally appends it to a JSONL file and POSTs it to a webhook."""
+    print(f"ALERT {alert['ticker']}: {alert['timeframe']} test confirmed on {alert['bar_date']} "
+          f"({alert['signal']}, close {alert['close']}, RelVol {alert['relvol']})", flush=True)
+
+    if alert_file:
+        with open(alert_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(alert) + "\n")
+
+    if webhook:
+        try:
+            request = urllib.request.Request(
+                webhook, data=json.dumps(alert).encode('utf-8'),
+                headers={'Content-Type': 'application/json'}, method='POST'
+            )
+            urllib.request.urlopen(request, timeout=10).close()
+        except Exception as e:
+            logging.error(f"Webhook delivery failed for {alert['ticker']}: {e}")
+
+def poll_once(setups, bars_cache, alert_file=None, webhook=None):
+    """One polling pass over the active setups. Confirmed setups are removed from 'setups'."""
+    now = pd.Timestamp.now(tz='America/New_York')
+    confirmed = []
+    for ticker, setup in setups.items():
+        baseline_period, recent_period = PERIODS[setup['interval']]
+        try:
+            if ticker not in bars_cache:
+                bars_cache[ticker] = fetch_history(ticker, baseline_period, setup['interval']).tail(SMA_PERIOD + 2)
+            else:
+                recent = fetch_history(ticker, recent_period, setup['interval'])
+                bars_cache[ticker] = merge_bars(bars_cache[ticker], recent)
+            # Fetch timestamps are exchange-local; compare in the same zone
+            bars = bars_cache[ticker]
+            if bars.index.tz is not None:
+                bars = bars.tz_convert('America/New_York')
+            alert = evaluate_latest_bar(bars, setup, now)
+        except Exception as e:
+            logging.error(f"Error polling {ticker}: {e}")
+            continue
+
+        if alert:
+            emit_alert(alert, alert_file, webhook)
+            confirmed.append(ticker)
+
+    for ticker in confirmed:
+        setups.pop(ticker)
+        bars_cache.pop(ticker, None)
+    return confirmed
+
+def run_monitor(interval, once=False, alert_file=None, webhook=None, report_dir=REPORT_DIR):
+    report_path = None
+    setups, bars_cache = {}, {}
+
+    while True:
+        # Hot-reload: a new daily report replaces the watch list
+        newest = latest_report(report_dir)
+        if newest is None:
+            logging.error(f"No reports found in {report_dir}/.")
+            return
+        if newest != report_path:
+            report_path = newest
+            setups = load_active_setups(report_path)
+            bars_cache = {}
+            logging.info(f"Watching {len(setups)} pending setups from {os.path.basename(report_path)}.")
+
+        start = time.perf_counter()
+        confirmed = poll_once(setups, bars_cache, alert_file, webhook)
+        logging.info(f"Polled {len(setups) + len(confirmed)} tickers in {time.perf_counter() - start:.1f}s, "
+                     f"{len(confirmed)} confirmed.")
+
+        if once:
+            return
+        time.sleep(interval)
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch WAIT_FOR_TEST / ENTER_PENDING_DAILY setups from the latest report and alert when a Test bar confirms.")
+    parser.add_argument('--interval', type=int, default=60, help="Seconds between polls (default: 60)")
+    parser.add_argument('--once', action='store_true', help="Poll once and exit")
+    parser.add_argument('--alert-file', help="Append alerts as JSON lines to this file")
+    parser.add_argument('--webhook', help="POST each alert as JSON to this URL")
+    parser.add_argument('--report-dir', default=REPORT_DIR)
+    args = parser.parse_args()
+
+    try:
+        run_monitor(args.interval, args.once, args.alert_file, args.webhook, args.report_dir)
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+REPORT_DIR = 'reports'
+HOST = '127.0.0.1'
+PORT = 8765
+# How often (at most) a request checks reports/ for a newer file
+RELOAD_CHECK_SECONDS = 1.0
+
+SIGNAL_STATUSES = ('_CONFIRMED_STRONG', '_CONFIRMED_EARLY', '_WATCH_FOR_TEST')
+REPORT_DATE = re.compile(r'REPORT_(\d{4}-\d{2}-\d{2})\.csv$')
+
+def signal_type(signal):
+    """'STOPPING_VOLUME_WATCH_FOR_TEST' -> 'STOPPING_VOLUME' (the CSV joins type and status)."""
+    for status in SIGNAL_STATUSES:
+        if signal.endswith(status):
+            return signal[:-len(status)]
+    return signal
+
+def report_files(report_dir=REPORT_DIR):
+    """Daily report CSVs in date order."""
+    return sorted(p for p in glob.glob(os.path.join(report_dir, "REPORT_*.csv")) if REPORT_DATE.search(p))
+
+def read_rows(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+def build_indexes(rows):
+    """
+    In-memory indexes over the latest report: {field: {value: set(row positions)}}.
+    'signal' and 'anchor_date' index both the weekly and the monthly columns.
+    """
+    indexes = {'ticker': {}, 'priority': {}, 'action': {}, 'signal': {}, 'anchor_date': {}}
+    for pos, row in enumerate(rows):
+        keys = {
+            'ticker': [row.get('Ticker', '')],
+            'priority': [row.get('Priority', '')],
+            'action': [row.get('Action', '')],
+            'signal': [signal_type(row.get('Weekly_Signal', '')), signal_type(row.get('Monthly_Signal', ''))],
+            'anchor_date': [row.get('Weekly_Anchor_Date', ''), row.get('Monthly_Anchor_Date', '')],
+        }
+        for field, values in keys.items():
+            for value in values:
+                if value and value != 'NONE':
+                    indexes[field].setdefault(value.upper(), set()).add(pos)
+    return indexes
+
+class ResultStore:
+    """Latest report (plus optional per-ticker history) held in memory, reloaded when a new report lands."""
+
+    def __init__(self, report_dir=REPORT_DIR, load_history=False):
+        self.report_dir = report_dir
+        self.load_history = load_history
+        self.lock = threading.Lock()
+        self.source = None      # (path, mtime) of the loaded report
+        self.rows = []
+        self.indexes = build_indexes([])
+        self.history = {}       # ticker -> [(date, row)]
+        self.digest = ''
+        self.last_check = 0.0
+
+    def maybe_reload(self):
+        now = time.monotonic()
+        if now - self.last_check < RELOAD_CHECK_SECONDS:
+            return
+        self.last_check = now
+
+        files = report_files(self.report_dir)
+        if not files:
+            return
+        latest = files[-1]
+        source = (latest, os.path.getmtime(latest))
+        if source == self.source:
+            return
+
+        with open(latest, 'rb') as f:
+            digest = hashlib.sha1(f.read()).hexdigest()
+        rows = read_rows(latest)
+        indexes = build_indexes(rows)
+
+        history = {}
+        if self.load_history:
+            for path in files:
+                date = REPORT_DATE.search(path).group(1)
+                for row in read_rows(path):
+                    history.setdefault(row['Ticker'].upper(), []).append(dict(row, Report_Date=date))
+
+        # Swap everything at once so requests never see a half-loaded store
+        with self.lock:
+            self.source, self.rows, self.indexes, self.history, self.digest = source, rows, indexes, history, digest
+        logging.info(f"Loaded {len(rows)} rows from {os.path.basename(latest)}"
+                     f"{f' (+ history of {len(files)} reports)' if self.load_history else ''}.")
+
+    def query(self, filters, limit=None):
+        """Rows matching every filter; comma-separated values within a filter are OR-ed."""
+        with self.lock:
+            rows, indexes = self.rows, self.indexes
+        positions = None
+        for field, raw in filters.items():
+            matched = set()
+            for value in raw.split(','):
+                matched |= indexes[field].get(value.strip().upper(), set())
+            positions = matched if positions is None else positions & matched
+        if positions is None:
+            positions = range(len(rows))
+        result = [rows[pos] for pos in sorted(positions)]
+        return result[:limit] if limit else result
+
+class QueryHandler(BaseHTTPRequestHandler):
+    store = None
+
+    def do_GET(self):
+        self.store.maybe_reload()
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        parts = [p for p in url.path.split('/') if p]
+
+        if parts == ['setups']:
+            filters = {k: v for k, v in params.items() if k in self.store.indexes}
+            unknown = set(params) - set(filters) - {'limit'}
+            if unknown:
+                return self.send_json(400, {'error': f"Unknown filter(s): {', '.join(sorted(unknown))}",
+                                            'filters': sorted(self.store.indexes)})
+            limit = int(params['limit']) if params.get('limit', '').isdigit() else None
+            rows = self.store.query(filters, limit)
+            return self.send_json(200, {'count': len(rows), 'results': rows})
+
+        if len(parts) == 2 and parts[0] == 'tickers':
+            rows = self.store.query({'ticker': parts[1]})
+            if not rows:
+                return self.send_json(404, {'error': f"{parts[1].upper()} not in the latest report"})
+            return self.send_json(200, rows[0])
+
+        if len(parts) == 2 and parts[0] == 'history':
+            if not self.store.load_history:
+                return self.send_json(404, {'error': "History not loaded (start with --history)"})
+            return self.send_json(200, {'ticker': parts[1].upper(), 'reports': self.store.history.get(parts[1].upper(), [])})
+
+        if parts in ([], ['meta']):
+            path = self.store.source[0] if self.store.source else None
+            return self.send_json(200, {
+                'report': os.path.basename(path) if path else None,
+                'rows': len(self.store.rows),
+                'filters': {field: len(values) for field, values in self.store.indexes.items()},
+                'endpoints': ['/setups?ticker=&priority=&action=&signal=&anchor_date=&limit=',
+                              '/tickers/<TICKER>', '/history/<TICKER>', '/meta'],
+            })
+
+        self.send_json(404, {'error': f"Unknown endpoint {url.path}"})
+
+    def send_json(self, status, payload):
+        # A response is fully determined by the loaded report and the URL
+        etag = '"' + hashlib.sha1(f"{self.store.digest}|{self.path}".encode()).hexdigest()[:20] + '"'
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if status == 200:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(format % args)
+
+def serve(host=HOST, port=PORT, report_dir=REPORT_DIR, load_history=False):
+    QueryHandler.store = ResultStore(report_dir, load_history)
+    QueryHandler.store.maybe_reload()
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    logging.info(f"Serving screener results on http://{host}:{port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP query API over the latest screener report.")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--report-dir', default=REPORT_DIR)
+    parser.add_argument('--history', action='store_true', help="Also index every past report per ticker")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.report_dir, args.history)
+
+if __name__ == "__main__":
+    main()
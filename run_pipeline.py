@@ -0,0 +1,145 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+import filter_tickers
+import analyze_vsa
+import generate_report
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+CACHE_DIR = '.pipeline_cache'
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def content_hash(*parts):
+    """Stable hash of JSON-serializable parts (dicts are hashed with sorted keys)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(json.dumps(part, sort_keys=True, default=str).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def source_hash(*filenames):
+    """Hash of the stage code, so editing a stage invalidates its cached output."""
+    digest = hashlib.sha256()
+    for filename in filenames:
+        with open(os.path.join(REPO_DIR, filename), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def load_cached(stage, key):
+    """Cached output of a stage if it was produced from the same inputs, else None."""
+    path = os.path.join(CACHE_DIR, f"{stage}.json")
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return entry['output'] if entry.get('key') == key else None
+
+def store_cached(stage, key, output):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(os.path.join(CACHE_DIR, f"{stage}.json"), 'w') as f:
+        json.dump({'key': key, 'created': datetime.now().isoformat(timespec='seconds'), 'output': output}, f)
+
+def run_stage(stage, key, func, force=False, is_valid=lambda output: True, cacheable=lambda output: True):
+    """
+    Runs a stage unless a cached output for the same input hash exists (and is still valid).
+    The output is only cached if cacheable(output), so a failed run is repeated next time.
+    """
+    if not force:
+        cached = load_cached(stage, key)
+        if cached is not None and is_valid(cached):
+            logging.info(f"[{stage}] inputs unchanged ({key[:12]}), reusing cached output.")
+            return cached
+
+    start = time.perf_counter()
+    output = func()
+    logging.info(f"[{stage}] finished in {time.perf_counter() - start:.1f}s.")
+    if cacheable(output):
+        store_cached(stage, key, output)
+    else:
+        logging.warning(f"[{stage}] incomplete, output not cached: the next run repeats this stage.")
+    return output
+
+def run_pipeline(ticker_file='tickers.txt', force=False, watchlists=None):
+    """
+    filter -> analyze -> report in one process, handing results over in memory.
+    Each stage is keyed by a hash of its inputs and code and skipped when unchanged.
+    The standalone files (filtered_tickers.json, vsa_results.json, reports/) are still written.
+    With watchlists ({name: ticker_file}) the union of the lists is fetched and analyzed once
+    and each list gets its own report in reports/<name>/ next to the combined one in reports/.
+    """
+    run_date = datetime.now().strftime('%Y-%m-%d')
+
+    # Filter: market data changes daily, so the run date is part of its inputs
+    if watchlists:
+        lists = {name: filter_tickers.load_tickers(path) for name, path in watchlists.items()}
+        screen_lists = lambda: filter_tickers.screen_watchlists(watchlists)
+    else:
+        lists = filter_tickers.load_tickers(ticker_file)
+        screen_lists = lambda: filter_tickers.screen_ticker_file(ticker_file)
+    filter_key = content_hash(
+        lists, run_date, filter_tickers.LOW_MEMORY,
+        source_hash('filter_tickers.py', 'vsa_utils.py', 'signal_lifecycle.py', 'fetch_guard.py')
+    )
+    # Only cached when every ticker was fetched, so tickers given up on are retried by the next run
+    screening = {}
+    def screen():
+        results, screening['complete'] = screen_lists()
+        return results
+    filtered = run_stage('filter', filter_key, screen, force, cacheable=lambda output: screening['complete'])
+
+    # Analyze: LLM mode/backend (not the key itself), endpoint, pre-ranking and batch size change the
+    # output, and so do the fake backends' latency, error rates and seed
+    llm = analyze_vsa.llm_clients
+    fake_settings = None
+    if llm.LLM_BACKEND in ('fake', 'fake-http'):
+        fake_settings = (llm.FAKE_LATENCY, llm.FAKE_RATE_LIMIT, llm.FAKE_MALFORMED, llm.FAKE_DROP, llm.FAKE_SEED)
+    analyze_key = content_hash(
+        filtered, bool(os.environ.get("GEMINI_API_KEY")), llm.LLM_BACKEND, llm.GEMINI_ENDPOINT, fake_settings,
+        analyze_vsa.LLM_MAX_TICKERS, analyze_vsa.LLM_MIN_SCORE, analyze_vsa.LLM_BATCH_SIZE,
+        source_hash('analyze_vsa.py', 'vsa_utils.py', 'llm_clients.py')
+    )
+    # Only a complete analysis is cached (the LLM answered every ticker sent to it), so a run hit
+    # by rate limits or a client error is retried by the next pipeline run without --force
+    analysis = {}
+    def analyze():
+        results, analysis['complete'] = analyze_vsa.analyze_tickers(filtered)
+        return results
+    results = run_stage('analyze', analyze_key, analyze, force, cacheable=lambda output: analysis['complete'])
+
+    # Report: output files are named by date; skip only if they still exist
+    report_key = content_hash(results, lists, run_date, source_hash('generate_report.py', 'signal_lifecycle.py'))
+    if watchlists:
+        report = lambda: generate_report.save_watchlist_reports(results, lists)
+    else:
+        report = lambda: generate_report.save_report(results)
+    report_files = run_stage(
+        'report', report_key, report, force,
+        is_valid=lambda files: all(os.path.exists(p) for p in files)
+    )
+    return report_files
+
+def main():
+    parser = argparse.ArgumentParser(description="Run filter -> analyze -> report in one process, skipping stages whose inputs are unchanged.")
+    parser.add_argument('ticker_file', nargs='?', default='tickers.txt')
+    parser.add_argument('--force', action='store_true', help="Ignore cached stage outputs and run every stage")
+    parser.add_argument('--list', action='append', metavar='NAME=PATH',
+                        help="Named ticker list (repeatable); each unique ticker is fetched once, one report per list")
+    args = parser.parse_args()
+    try:
+        watchlists = filter_tickers.parse_watchlists(args.list or [])
+    except ValueError as e:
+        parser.error(str(e))
+    run_pipeline(args.ticker_file, args.force, watchlists)
+
+if __name__ == "__main__":
+    main()
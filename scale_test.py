@@ -0,0 +1,144 @@
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Budgets the run is checked against. Wall time and memory scale with universe size,
+# throughput is a floor in tickers (or results) per second for each stage.
+DEFAULT_BUDGETS = {
+    'wall_seconds_per_1k': 240,
+    'peak_rss_mb_base': 400,
+    'peak_rss_mb_per_1k': 150,
+    'min_throughput': {'filter': 5, 'analyze': 50, 'report': 100},
+}
+DEFAULT_SIZES = [1000, 5000, 10000]
+
+def run_worker(size, workdir):
+    """
+    Runs filter -> analyze (passthrough) -> report for a synthetic universe of 'size' tickers
+    inside 'workdir', with filter_tickers fetching from the local stub data source.
+    Prints one JSON line with per-stage timings and peak RSS.
+    """
+    os.chdir(workdir)
+    os.environ.pop("GEMINI_API_KEY", None)  # Force passthrough: no LLM calls in load tests
+
+    import synthetic_data
+    import vsa_utils
+    import filter_tickers
+    import analyze_vsa
+    import generate_report
+
+    logging.getLogger().setLevel(logging.WARNING)
+    filter_tickers.fetch_history = synthetic_data.stub_fetch_history
+    filter_tickers.REQUEST_DELAY = 0
+
+    ticker_file = 'scale_tickers.txt'
+    with open(ticker_file, 'w') as f:
+        f.write("\n".join(synthetic_data.make_universe(size)))
+
+    stages = {}
+    start = time.perf_counter()
+
+    t0 = time.perf_counter()
+    filtered = filter_tickers.process_tickers(ticker_file)
+    stages['filter'] = {'seconds': time.perf_counter() - t0, 'items': size}
+
+    t0 = time.perf_counter()
+    results = analyze_vsa.run_analysis()
+    stages['analyze'] = {'seconds': time.perf_counter() - t0, 'items': len(results)}
+
+    t0 = time.perf_counter()
+    generate_report.save_report()
+    stages['report'] = {'seconds': time.perf_counter() - t0, 'items': len(results)}
+
+    print(json.dumps({
+        'size': size,
+        'filtered': len(filtered),
+        'wall_seconds': time.perf_counter() - start,
+        'peak_rss_mb': vsa_utils.peak_rss_mb(),
+        'stages': stages,
+    }))
+
+def check_budgets(run, budgets):
+    """Returns a list of budget violations (empty if the run is within budget)."""
+    failures = []
+    per_1k = run['size'] / 1000
+
+    max_wall = budgets['wall_seconds_per_1k'] * per_1k
+    if run['wall_seconds'] > max_wall:
+        failures.append(f"wall time {run['wall_seconds']:.1f}s > {max_wall:.1f}s")
+
+    max_rss = budgets['peak_rss_mb_base'] + budgets['peak_rss_mb_per_1k'] * per_1k
+    if run['peak_rss_mb'] is not None and run['peak_rss_mb'] > max_rss:
+        failures.append(f"peak RSS {run['peak_rss_mb']:.0f} MB > {max_rss:.0f} MB")
+
+    for stage, floor in budgets['min_throughput'].items():
+        stats = run['stages'][stage]
+        # Stages with nothing to do (e.g. no filtered tickers) have no meaningful throughput
+        if stats['items'] == 0 or stats['seconds'] == 0:
+            continue
+        throughput = stats['items'] / stats['seconds']
+        if throughput < floor:
+            failures.append(f"{stage} throughput {throughput:.1f}/s < {floor}/s")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end scale test: filter -> analyze (passthrough) -> report on synthetic universes.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Universe sizes to run (default: 1000 5000 10000)")
+    parser.add_argument('--budgets', help="JSON file overriding DEFAULT_BUDGETS")
+    parser.add_argument('--output', help="Write the collected measurements as JSON to this file")
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.workdir)
+        return
+
+    budgets = dict(DEFAULT_BUDGETS)
+    if args.budgets:
+        with open(args.budgets, 'r') as f:
+            budgets.update(json.load(f))
+
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    runs = []
+    failed = False
+
+    for size in args.sizes:
+        # One process per size so peak RSS and import state are not shared between runs
+        with tempfile.TemporaryDirectory(prefix=f"vsa_scale_{size}_") as workdir:
+            proc = subprocess.run(
+                [sys.executable, os.path.join(repo_dir, 'scale_test.py'), '--worker', str(size), '--workdir', workdir],
+                capture_output=True, text=True, cwd=repo_dir
+            )
+        if proc.returncode != 0:
+            print(f"[{size:>6}] FAILED (exit {proc.returncode})\n{proc.stderr[-2000:]}")
+            failed = True
+            continue
+
+        run = json.loads(proc.stdout.strip().splitlines()[-1])
+        run['failures'] = check_budgets(run, budgets)
+        runs.append(run)
+
+        throughput = ", ".join(
+            f"{stage} {s['items'] / s['seconds']:.0f}/s" if s['seconds'] else f"{stage} -"
+            for stage, s in run['stages'].items()
+        )
+        rss = f"{run['peak_rss_mb']:.0f} MB" if run['peak_rss_mb'] is not None else "n/a"
+        status = "OK" if not run['failures'] else "OVER BUDGET: " + "; ".join(run['failures'])
+        print(f"[{size:>6}] {run['wall_seconds']:.1f}s wall, peak RSS {rss}, "
+              f"{run['filtered']} filtered | {throughput} | {status}")
+        failed = failed or bool(run['failures'])
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'budgets': budgets, 'runs': runs}, f, indent=4)
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
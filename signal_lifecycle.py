@@ -0,0 +1,153 @@
+import json
+import logging
+import os
+from datetime import date, datetime
+
+STATE_FILE = 'signal_state.json'
+TIMEFRAMES = ('weekly', 'monthly')
+
+# Higher rank = further along the Anchor -> Test -> Test sequence
+STATUS_RANK = {'WATCH_FOR_TEST': 1, 'CONFIRMED_EARLY': 2, 'CONFIRMED_STRONG': 3}
+# Setups of tickers that were not screened for this long (e.g. removed from the list) are expired
+STALE_DAYS = 30
+# Expired setups are kept this long for the report/dashboard, then dropped from the store
+RETENTION_DAYS = 90
+
+def setup_key(ticker, timeframe, anchor_date):
+    return f"{ticker}|{timeframe}|{anchor_date}"
+
+def load_state(path=STATE_FILE):
+    if not os.path.exists(path):
+        return {'setups': {}}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable {path}: {e}")
+        return {'setups': {}}
+
+def save_state(state, path=STATE_FILE):
+    with open(path, 'w') as f:
+        json.dump(state, f, indent=1)
+
+def _days_between(start, end):
+    return (date.fromisoformat(end) - date.fromisoformat(start)).days
+
+def update_state(state, filtered_results, screened, run_date):
+    """
+    Records this run's signals in the store keyed by (ticker, timeframe, anchor_date):
+    first/last seen dates, status transitions and expiry. 'screened' is the set of tickers
+    that were actually evaluated this run (fetch failures must not expire a setup).
+    Re-running on the same day is idempotent.
+    """
+    setups = state.setdefault('setups', {})
+    seen = set()
+
+    for ticker, data in filtered_results.items():
+        for timeframe in TIMEFRAMES:
+            signal = data.get(f'{timeframe}_signal') or {}
+            if signal.get('signal') != 'DETECTED':
+                continue
+            key = setup_key(ticker, timeframe, signal['anchor_date'])
+            seen.add(key)
+            status = signal.get('status')
+            entry = setups.get(key)
+
+            if entry is None:
+                setups[key] = {
+                    'ticker': ticker,
+                    'timeframe': timeframe,
+                    'anchor_date': signal['anchor_date'],
+                    'type': signal.get('type'),
+                    'status': status,
+                    'first_seen': run_date,
+                    'last_seen': run_date,
+                    'expired_on': None,
+                    'transitions': [{'date': run_date, 'from': None, 'to': status}],
+                }
+                continue
+
+            if entry['expired_on'] is not None:
+                entry['transitions'].append({'date': run_date, 'from': 'EXPIRED', 'to': status})
+            elif entry['status'] != status:
+                entry['transitions'].append({'date': run_date, 'from': entry['status'], 'to': status})
+            entry['status'] = status
+            entry['last_seen'] = run_date
+            entry['expired_on'] = None
+
+    for key, entry in list(setups.items()):
+        if key in seen:
+            continue
+        if entry['expired_on'] is None:
+            dropped = entry['ticker'] in screened and entry['last_seen'] < run_date
+            stale = _days_between(entry['last_seen'], run_date) > STALE_DAYS
+            if dropped or stale:
+                entry['expired_on'] = run_date
+                entry['transitions'].append({'date': run_date, 'from': entry['status'], 'to': 'EXPIRED'})
+        elif _days_between(entry['expired_on'], run_date) > RETENTION_DAYS:
+            del setups[key]
+
+    state['last_run'] = run_date
+    return state
+
+def classify(entry, run_date):
+    """
+    NEW / REVIVED / UPGRADED / DOWNGRADED / EXPIRED / ONGOING for a setup as of run_date.
+    REVIVED: the setup had expired before today and is detected again (at any status).
+    """
+    if entry.get('expired_on') == run_date:
+        return 'EXPIRED'
+    if entry['first_seen'] == run_date:
+        return 'NEW'
+    # Net change over today's transitions (a same-day re-run may add several)
+    today = [t for t in entry['transitions'] if t['date'] == run_date]
+    if today:
+        if today[0]['from'] == 'EXPIRED':
+            return 'REVIVED'
+        delta = STATUS_RANK.get(today[-1]['to'], 0) - STATUS_RANK.get(today[0]['from'], 0)
+        if delta > 0:
+            return 'UPGRADED'
+        if delta < 0:
+            return 'DOWNGRADED'
+    return 'ONGOING'
+
+def daily_changes(state, run_date=None):
+    """{'new': [...], 'revived': [...], 'upgraded': [...], 'downgraded': [...], 'expired': [...]} setups for run_date (default: last run)."""
+    run_date = run_date or state.get('last_run')
+    changes = {'new': [], 'revived': [], 'upgraded': [], 'downgraded': [], 'expired': []}
+    for entry in state.get('setups', {}).values():
+        label = classify(entry, run_date).lower()
+        if label in changes:
+            changes[label].append(entry)
+    for entries in changes.values():
+        entries.sort(key=lambda e: (e['ticker'], e['timeframe']))
+    return changes
+
+def lifecycle_summary(state, ticker, data, run_date):
+    """Per-timeframe lifecycle info attached to a filtered result for the LLM/report."""
+    summary = {}
+    for timeframe in TIMEFRAMES:
+        signal = data.get(f'{timeframe}_signal') or {}
+        if signal.get('signal') != 'DETECTED':
+            continue
+        entry = state['setups'].get(setup_key(ticker, timeframe, signal['anchor_date']))
+        if entry:
+            summary[timeframe] = {
+                'change': classify(entry, run_date),
+                'first_seen': entry['first_seen'],
+                'age_days': _days_between(entry['first_seen'], run_date),
+                'transitions': len(entry['transitions']) - 1,
+            }
+    return summary
+
+def update_lifecycle(filtered_results, screened, run_date=None, path=STATE_FILE):
+    """Loads the store, records this run, attaches 'lifecycle' to each result and saves the store."""
+    run_date = run_date or datetime.now().strftime('%Y-%m-%d')
+    state = update_state(load_state(path), filtered_results, set(screened), run_date)
+    for ticker, data in filtered_results.items():
+        data['lifecycle'] = lifecycle_summary(state, ticker, data, run_date)
+    save_state(state, path)
+
+    changes = daily_changes(state, run_date)
+    logging.info("Lifecycle: " + ", ".join(f"{len(v)} {k}" for k, v in changes.items()))
+    return changes
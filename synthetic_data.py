@@ -0,0 +1,72 @@
+import zlib
+
+import numpy as np
+import pandas as pd
+
+# Bar frequency and yfinance-style index anchor per interval
+INTERVAL_FREQ = {'1d': 'B', '1wk': 'W-MON', '1mo': 'MS'}
+BARS_PER_YEAR = {'1d': 252, '1wk': 52, '1mo': 12}
+# History available per stub ticker (the longest period the screener requests)
+STUB_HISTORY = '5y'
+
+def make_ohlcv(n_bars, interval='1d', seed=0, end=None):
+    """
+    Generates a realistic-looking OHLCV frame shaped like yfinance's Ticker.history() output:
+    tz-aware index, float64 prices, int64 Volume and the Dividends / Stock Splits / Capital Gains columns.
+    Prices follow a geometric random walk; volume is lognormal with occasional climactic spikes
+    so that Anchor / Test patterns actually occur.
+    """
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp(end or pd.Timestamp.now().normalize())
+    index = pd.date_range(end=end, periods=n_bars, freq=INTERVAL_FREQ[interval], tz='America/New_York')
+
+    scale = {'1d': 1.0, '1wk': 2.2, '1mo': 4.5}[interval]
+    start_price = rng.uniform(5, 500)
+    returns = rng.normal(0.0003 * scale, 0.02 * scale, n_bars)
+    close = start_price * np.exp(np.cumsum(returns))
+    open_ = close * np.exp(rng.normal(0, 0.008 * scale, n_bars))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.02 * scale, n_bars))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.02 * scale, n_bars))
+
+    base_volume = rng.uniform(2e5, 2e7) * scale
+    volume = base_volume * rng.lognormal(0, 0.35, n_bars)
+    spikes = rng.random(n_bars) < 0.04
+    volume[spikes] *= rng.uniform(2.0, 4.0, spikes.sum())
+
+    return pd.DataFrame({
+        'Open': open_,
+        'High': high,
+        'Low': low,
+        'Close': close,
+        'Volume': volume.astype(np.int64),
+        'Dividends': 0.0,
+        'Stock Splits': 0.0,
+        'Capital Gains': 0.0,
+    }, index=index)
+
+def period_to_bars(period, interval):
+    """Approximate number of bars yfinance returns for a period string ('6mo', '2y', ...)."""
+    if period.endswith('mo'):
+        years = int(period[:-2]) / 12
+    elif period.endswith('y'):
+        years = int(period[:-1])
+    elif period.endswith('d'):
+        years = int(period[:-1]) / 365
+    else:
+        raise ValueError(f"Unsupported period: {period}")
+    return max(1, int(round(years * BARS_PER_YEAR[interval])))
+
+def stub_fetch_history(ticker, period, interval):
+    """
+    Local stand-in for filter_tickers.fetch_history: one fixed STUB_HISTORY-long series per
+    (ticker, interval), of which the period selects the tail. Repeated fetches, and fetches of
+    different periods ('1mo' vs '2y' weekly), return the same bars for the same dates, as the
+    prescreen expects from the real provider. Longer periods return the whole series.
+    """
+    seed = zlib.crc32(f"{ticker}|{interval}".encode())
+    df = make_ohlcv(period_to_bars(STUB_HISTORY, interval), interval=interval, seed=seed)
+    return df.tail(period_to_bars(period, interval))
+
+def make_universe(n_tickers):
+    """Synthetic ticker symbols (T00000, T00001, ...)."""
+    return [f"T{i:05d}" for i in range(n_tickers)]
@@ -0,0 +1,98 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Stage modules are imported inside each handler: `vsa report` never pays for pandas,
+# yfinance or the Gemini SDK, and `vsa analyze` in passthrough mode never loads the SDK.
+
+def watchlists(args):
+    """{name: ticker_file} from repeated --list NAME=PATH options ({} if none)."""
+    import filter_tickers
+    try:
+        return filter_tickers.parse_watchlists(args.list or [])
+    except ValueError as e:
+        sys.exit(f"vsa: error: {e}")
+
+def cmd_filter(args):
+    import filter_tickers
+    lists = watchlists(args)
+    if lists:
+        filter_tickers.process_watchlists(lists)
+    else:
+        filter_tickers.process_tickers(args.ticker_file)
+
+def cmd_analyze(args):
+    import analyze_vsa
+    analyze_vsa.run_analysis()
+
+def cmd_report(args):
+    import generate_report
+    lists = watchlists(args)
+    if lists:
+        import filter_tickers
+        generate_report.save_watchlist_reports(None, {name: filter_tickers.load_tickers(path) for name, path in lists.items()})
+    else:
+        generate_report.save_report()
+
+def cmd_all(args):
+    import run_pipeline
+    run_pipeline.run_pipeline(args.ticker_file, args.force, watchlists(args))
+
+def cmd_startup(args):
+    """
+    Measures cold-start time of each subcommand: a fresh interpreter per run, in an empty
+    working directory, so every stage exits as soon as it finds nothing to do.
+    """
+    script = os.path.abspath(__file__)
+    commands = [['filter'], ['analyze'], ['report'], ['all']]
+    with tempfile.TemporaryDirectory(prefix='vsa_startup_') as workdir:
+        open(os.path.join(workdir, 'tickers.txt'), 'w').close()
+
+        def best_of(argv):
+            times = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                subprocess.run(argv, cwd=workdir, capture_output=True, check=True)
+                times.append(time.perf_counter() - start)
+            return min(times)
+
+        baseline = best_of([sys.executable, '-c', 'pass'])
+        print(f"{'python -c pass':<16} {baseline * 1000:8.0f} ms")
+        for command in commands:
+            elapsed = best_of([sys.executable, script] + command)
+            print(f"{'vsa ' + command[0]:<16} {elapsed * 1000:8.0f} ms  (+{(elapsed - baseline) * 1000:.0f} ms over bare interpreter)")
+
+def main():
+    parser = argparse.ArgumentParser(prog='vsa', description="VSA screener: filter -> analyze -> report.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('filter', help="Scan tickers for VSA sequences (writes filtered_tickers.json)")
+    p.add_argument('ticker_file', nargs='?', default='tickers.txt')
+    p.add_argument('--list', action='append', metavar='NAME=PATH', help="Named ticker list (repeatable)")
+    p.set_defaults(func=cmd_filter)
+
+    p = sub.add_parser('analyze', help="Analyze filtered tickers with Gemini, or passthrough without GEMINI_API_KEY (writes vsa_results.json)")
+    p.set_defaults(func=cmd_analyze)
+
+    p = sub.add_parser('report', help="Generate the Markdown and CSV reports in reports/ (reports/<name>/ per --list)")
+    p.add_argument('--list', action='append', metavar='NAME=PATH', help="Named ticker list (repeatable)")
+    p.set_defaults(func=cmd_report)
+
+    p = sub.add_parser('all', help="Run every stage in one process, skipping stages whose inputs are unchanged")
+    p.add_argument('ticker_file', nargs='?', default='tickers.txt')
+    p.add_argument('--force', action='store_true', help="Ignore cached stage outputs")
+    p.add_argument('--list', action='append', metavar='NAME=PATH', help="Named ticker list (repeatable)")
+    p.set_defaults(func=cmd_all)
+
+    p = sub.add_parser('startup', help="Measure cold-start time of each subcommand")
+    p.add_argument('--repeat', type=int, default=3, help="Runs per subcommand (best is reported)")
+    p.set_defaults(func=cmd_startup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
 import pandas as pd
 import numpy as np
 
+# Minimum RelVol for an Anchor bar (Stopping Volume / Buying Climax / Supply Dominance)
+ANCHOR_RELVOL_THRESHOLD = 1.8
+
 def calculate_spread(df):
     """
     Calculates the spread (High - Low) for each bar.
@@ -17,11 +20,47 @@ def calculate_clv(df):
     Appends 'CLV' column to df.
     Handles division by zero (if High == Low) by setting CLV to 0.
     """
-    high_low_diff = df['High'] - df['Low']
-    # Avoid division by zero
-    high_low_diff.replace(0, 0.0001, inplace=True) 
+    high = df['High'].to_numpy()
+    low = df['Low'].to_numpy()
+    close = df['Close'].to_numpy()
+    high_low_diff = high - low
+    # Avoid division by zero (in place on our own array, no replace() copy)
+    high_low_diff[high_low_diff == 0] = 0.0001
     
-    df['CLV'] = ((df['Close'] - df['Low']) - (df['High'] - df['Close'])) / high_low_diff
+    df['CLV'] = ((close - low) - (high - close)) / high_low_diff
+    return df
+
+def rolling_means(series, windows):
+    """
+    Trailing means of one series for several window lengths from a single cumulative sum:
+    {window: array}. Same result as series.rolling(window).mean() (NaN until the window holds
+    'window' valid values). Summed in float64; float32 input gives float32 output (low-memory mode).
+    """
+    values = np.asarray(series, dtype=np.float64)
+    valid = ~np.isnan(values)
+    # Leading zero so that a window ending at i is csum[i + 1] - csum[i + 1 - w]
+    csum = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(valid)))
+    out_dtype = np.float32 if getattr(series, 'dtype', None) == np.float32 else np.float64
+
+    means = {}
+    for window in windows:
+        mean = np.full(len(values), np.nan)
+        if window <= len(values):
+            sums = csum[window:] - csum[:-window]
+            full = (counts[window:] - counts[:-window]) == window
+            mean[window - 1:] = np.where(full, sums / window, np.nan)
+        means[window] = mean.astype(out_dtype, copy=False)
+    return means
+
+def _rolling_mean(series, window):
+    """Rolling mean as a Series aligned with the input (see rolling_means)."""
+    return pd.Series(rolling_means(series, [window])[window], index=series.index)
+
+def _relative_volume(df):
+    # Avoid division by zero
+    filled_sma = np.where(df['VolSMA'].to_numpy() == 0, 1, df['VolSMA'].to_numpy())
+    df['RelVol'] = df['Volume'].to_numpy() / filled_sma
     return df
 
 def calculate_relative_volume(df, sma_period=20):
@@ -29,11 +68,8 @@ def calculate_relative_volume(df, sma_period=20):
     Calculates Relative Volume (Vol / SMA_Vol).
     Appends 'VolSMA' and 'RelVol' columns to df.
     """
-    df['VolSMA'] = df['Volume'].rolling(window=sma_period).mean()
-    # Avoid division by zero
-    filled_sma = df['VolSMA'].replace(0, 1)
-    df['RelVol'] = df['Volume'] / filled_sma
-    return df
+    df['VolSMA'] = _rolling_mean(df['Volume'], sma_period)
+    return _relative_volume(df)
 
 def calculate_average_spread(df, sma_period=20):
     """
@@ -42,19 +78,68 @@ def calculate_average_spread(df, sma_period=20):
     """
     if 'Spread' not in df.columns:
         df = calculate_spread(df)
-    df['SpreadSMA'] = df['Spread'].rolling(window=sma_period).mean()
+    df['SpreadSMA'] = _rolling_mean(df['Spread'], sma_period)
+    return df
+
+# Columns the VSA logic reads; yfinance also returns Dividends, Stock Splits, Capital Gains
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+def compact_frame(df):
+    """
+    Low-memory ingest: keeps only OHLCV and stores it as float32 (half the size of float64).
+    Features computed afterwards by prepare_vsa_features are float32 as well.
+    A frame that is already compact (e.g. by get_data at ingest) is returned as is, not copied.
+    """
+    columns = [c for c in OHLCV_COLUMNS if c in df.columns]
+    if len(columns) == len(df.columns) and (df.dtypes == np.float32).all():
+        return df
+    return df[columns].astype(np.float32)
+
+def calculate_rolling_features(df, sma_period=20, windows=()):
+    """
+    All moving averages in one cumulative-sum pass per series (rolling_means):
+    'VolSMA' and 'SpreadSMA' over sma_period, plus 'Volume_SMA<w>', 'Spread_SMA<w>' and
+    'Close_SMA<w>' for each of the extra windows (e.g. (10, 20, 50); Close_SMA<sma_period> included).
+    """
+    if 'Spread' not in df.columns:
+        df = calculate_spread(df)
+    windows = sorted(set(windows))
+    extra = [w for w in windows if w != sma_period]
+    for col, name in (('Volume', 'VolSMA'), ('Spread', 'SpreadSMA')):
+        means = rolling_means(df[col], [sma_period] + extra)
+        df[name] = means[sma_period]
+        for window in extra:
+            df[f'{col}_SMA{window}'] = means[window]
+    if windows:
+        for window, mean in rolling_means(df['Close'], windows).items():
+            df[f'Close_SMA{window}'] = mean
     return df
 
-def prepare_vsa_features(df, sma_period=20):
+def prepare_vsa_features(df, sma_period=20, low_memory=False, windows=()):
     """
     Runs all VSA calculations on the dataframe.
+    low_memory: drop unused columns and compute/store features as float32.
+    windows: extra SMA windows for Volume/Spread/Close (see calculate_rolling_features).
     """
+    if low_memory:
+        df = compact_frame(df)
     df = calculate_spread(df)
     df = calculate_clv(df)
-    df = calculate_relative_volume(df, sma_period)
-    df = calculate_average_spread(df, sma_period)
+    df = calculate_rolling_features(df, sma_period, windows)
+    df = _relative_volume(df)
     return df
 
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where 'resource' is unavailable (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    import sys
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
 def check_no_supply(row, prev_close):
     """
     Checks for 'No Supply' pattern on a single row (pandas Series).
@@ -107,7 +192,7 @@ def identify_anchor_bar(row, prev_close):
     is_up = row['Close'] > prev_close
     
     # Ultra High Volume is a key characteristic for Anchors
-    is_high_vol = row['RelVol'] > 1.8 
+    is_high_vol = row['RelVol'] > ANCHOR_RELVOL_THRESHOLD
     
     # STOPPING VOLUME: High Vol + Down Move + Close off lows
     if is_down and is_high_vol and row['CLV'] > -0.25:
@@ -160,90 +245,257 @@ def identify_test_bar(row, prev_close, type='BULLISH'):
             
     return False
 
-def check_vsa_sequence(df, lookback=5):
+def _next_true(mask):
+    """next_idx[k] = smallest j >= k with mask[j], or len(mask) if none (one backward pass)."""
+    n = len(mask)
+    positions = np.where(mask, np.arange(n), n)
+    return np.minimum.accumulate(positions[::-1])[::-1]
+
+def scan_vsa_sequences(df, lookback=5):
     """
-    Scans the last 'lookback' bars for a VSA Sequence.
-    Bullish: Anchor (Stopping Vol) -> Primary Test -> Secondary Test (Optional)
-    Bearish: Anchor (Buying Climax) -> Primary No Demand -> Secondary No Demand (Optional)
+    Scans the last 'lookback' bars for EVERY VSA Sequence, in linear time.
+    Same rules as identify_anchor_bar / identify_test_bar, evaluated as vectorized masks;
+    each anchor's first two later Test bars are found with a precomputed next-Test index
+    instead of a forward scan per anchor, so long lookbacks (52 weekly, 250 daily) stay cheap.
     
-    Returns a dict with sequence details.
+    Returns a list of sequence dicts (oldest anchor first) with dates and bar indices (positions in df).
     """
-    # Ensure we have enough data
     if len(df) < lookback + 1:
-        return {"signal": "NONE", "verdict": "NEUTRAL"}
+        return []
     
-    subset = df.iloc[-(lookback+1):] # Take lookback + 1 to have prev_close for the first bar of lookback
+    subset = df.iloc[-(lookback+1):] # lookback + 1 to have prev_close for the first bar of lookback
+    offset = len(df) - len(subset)
     
-    # Trackers
-    anchor_found = None # (Type, Date/Index)
-    primary_test = None # (Date/Index)
-    secondary_test = None # (Date/Index)
+    close = subset['Close'].to_numpy(dtype='float64')
+    rel_vol = subset['RelVol'].to_numpy(dtype='float64')
+    clv = subset['CLV'].to_numpy(dtype='float64')
+    spread = subset['Spread'].to_numpy(dtype='float64')
+    spread_sma = subset['SpreadSMA'].to_numpy(dtype='float64')
     
-    # 1. Scan for Anchor
-    # We scan from the start of the window up to the 2nd to last bar (need space for test)
-    # Using integer indexing on the subset
+    prev_close = np.empty_like(close)
+    prev_close[0] = np.nan # The first bar only provides prev_close
+    prev_close[1:] = close[:-1]
     
-    potential_signals = []
+    is_down = close < prev_close
+    is_up = close > prev_close
+    is_low_vol = rel_vol < 0.85
+    is_narrow = spread < (spread_sma * 0.85)
     
-    # Convert to list of dicts for easier iteration with index tracking related to original dates if needed
-    # But for now, we just need relative position in the window.
+    # Anchors (identify_anchor_bar)
+    is_high_vol = rel_vol > ANCHOR_RELVOL_THRESHOLD
+    stopping = is_down & is_high_vol & (clv > -0.25)
+    weak_close = is_high_vol & (clv < 0.25) & ~stopping
+    climax = weak_close & is_up
+    dominance = weak_close & is_down
     
-    dates = subset.index.tolist()
+    # Tests (identify_test_bar)
+    bullish_test = (is_down & is_low_vol & (clv > -0.8)) | (is_narrow & is_low_vol)
+    bearish_test = (is_up & is_low_vol & (clv < 0.8)) | (is_up & is_narrow & is_low_vol)
     
-    for i in range(1, len(subset)):
-        curr_row = subset.iloc[i]
-        prev_close = subset.iloc[i-1]['Close']
-        date_str = dates[i].strftime('%Y-%m-%d')
+    n = len(subset)
+    next_test = {'BULLISH': _next_true(bullish_test), 'BEARISH': _next_true(bearish_test)}
+    dates = subset.index
+    
+    sequences = []
+    for i in np.flatnonzero(stopping | climax | dominance):
+        anchor_type = 'STOPPING_VOLUME' if stopping[i] else 'BUYING_CLIMAX' if climax[i] else 'SUPPLY_DOMINANCE'
+        nxt = next_test['BULLISH' if anchor_type == 'STOPPING_VOLUME' else 'BEARISH']
         
-        # Check patterns
-        anchor_type = identify_anchor_bar(curr_row, prev_close)
+        test1 = nxt[i + 1] if i + 1 < n else n
+        test2 = nxt[test1 + 1] if test1 + 1 < n else n
         
-        if anchor_type:
-            # Found an anchor. Now look ahead for tests.
-            anchor_found = (anchor_type, date_str, i)
-            
-            # Reset tests for this new anchor candidate
-            primary_test = None
-            secondary_test = None
-            
-            test_type_target = 'BULLISH' if anchor_type == 'STOPPING_VOLUME' else 'BEARISH'
-            
-            # Scan forward from anchor
-            for j in range(i + 1, len(subset)):
-                test_row = subset.iloc[j]
-                test_prev = subset.iloc[j-1]['Close']
-                test_date = dates[j].strftime('%Y-%m-%d')
-                
-                if identify_test_bar(test_row, test_prev, type=test_type_target):
-                    if not primary_test:
-                        primary_test = (test_date, j)
-                    elif not secondary_test:
-                        secondary_test = (test_date, j)
-            
-            # Evaluate this sequence
-            status = "NONE"
-            if primary_test and secondary_test:
-                status = "CONFIRMED_STRONG"
-            elif primary_test:
-                status = "CONFIRMED_EARLY"
-            else:
-                status = "WATCH_FOR_TEST"
-                
-            signal = {
-                "signal": "DETECTED",
-                "type": anchor_type,
-                "status": status,
-                "anchor_date": anchor_found[1],
-                "test1_date": primary_test[0] if primary_test else None,
-                "test2_date": secondary_test[0] if secondary_test else None
-            }
-            potential_signals.append(signal)
-
-    # Return the most recent/relevant signal
-    if not potential_signals:
+        if test2 < n:
+            status = "CONFIRMED_STRONG"
+        elif test1 < n:
+            status = "CONFIRMED_EARLY"
+        else:
+            status = "WATCH_FOR_TEST"
+        
+        sequences.append({
+            "signal": "DETECTED",
+            "type": anchor_type,
+            "status": status,
+            "anchor_date": dates[i].strftime('%Y-%m-%d'),
+            "test1_date": dates[test1].strftime('%Y-%m-%d') if test1 < n else None,
+            "test2_date": dates[test2].strftime('%Y-%m-%d') if test2 < n else None,
+            "anchor_index": int(offset + i),
+            "test1_index": int(offset + test1) if test1 < n else None,
+            "test2_index": int(offset + test2) if test2 < n else None
+        })
+    
+    return sequences
+
+def check_vsa_sequence(df, lookback=5):
+    """
+    Scans the last 'lookback' bars for a VSA Sequence.
+    Bullish: Anchor (Stopping Vol) -> Primary Test -> Secondary Test (Optional)
+    Bearish: Anchor (Buying Climax) -> Primary No Demand -> Secondary No Demand (Optional)
+    
+    Returns a dict with sequence details (the most recent anchor's sequence).
+    Use scan_vsa_sequences for every sequence in the window.
+    """
+    sequences = scan_vsa_sequences(df, lookback)
+    
+    if not sequences:
          return {"signal": "NONE", "verdict": "NEUTRAL"}
-         
-    # Prioritize the "freshest" sequence or the most confirmed one?
+    
     # Usually the most recent Anchor is the dominant context.
-    return potential_signals[-1]
+    latest = sequences[-1]
+    return {k: v for k, v in latest.items() if not k.endswith('_index')}
+
+def anchor_possible(volumes, sma_period=20, lookback=5):
+    """
+    Cheap necessary-condition check for check_vsa_sequence: can any of the last 'lookback' bars
+    be an Anchor? An anchor needs RelVol > ANCHOR_RELVOL_THRESHOLD, so only Volume is needed.
+    volumes: Series of bar volumes in date order (may be a short recent tail).
+    Returns True if an anchor cannot be ruled out (including when there is too little data to prove it).
+    """
+    # Exact RelVol for the last 'lookback' bars needs a full SMA window behind each of them
+    if len(volumes) < sma_period + lookback - 1:
+        return True
+    tail = volumes.iloc[-(sma_period + lookback - 1):].astype('float64')
+    vol_sma = tail.rolling(window=sma_period).mean().iloc[-lookback:]
+    rel_vol = tail.iloc[-lookback:] / vol_sma.replace(0, 1)
+    # Tiny tolerance: rolling sums over a tail can differ from the full-history ones in the last bits
+    return bool((rel_vol > ANCHOR_RELVOL_THRESHOLD * (1 - 1e-9)).any())
+
+# --- PRE-RANKING (LLM BUDGET) ---
+
+PRIORITY_WEIGHTS = {"VERY_HIGH": 4, "HIGH": 3, "MEDIUM": 2, "LOW": 1}
+STATUS_WEIGHTS = {"CONFIRMED_STRONG": 3, "CONFIRMED_EARLY": 2, "WATCH_FOR_TEST": 1}
+BULLISH_ANCHORS = ("STOPPING_VOLUME",)
+
+def score_setups(tickers_data):
+    """
+    Scores filtered tickers in one vectorized table so only the strongest setups go to the LLM.
+    Components: priority, weekly/monthly sequence status, RelVol and CLV at the weekly anchor,
+    alignment of quarterly/monthly/weekly context with the anchor direction, and daily confirmation.
+    Returns a DataFrame indexed by ticker (sorted by 'score', highest first).
+    """
+    columns = ['priority', 'w_status', 'm_status', 'w_type', 'anchor_relvol', 'anchor_clv',
+               'q_context', 'm_context', 'w_context', 'daily_confirmation']
+    rows = []
+    for ticker, data in tickers_data.items():
+        w_sig = data.get('weekly_signal') or {}
+        m_sig = data.get('monthly_signal') or {}
+        # Anchor bar stats come from the serialized weekly bars (anchor is always inside that window)
+        anchor_bar = (data.get('weekly_data') or {}).get(w_sig.get('anchor_date'), {})
+        rows.append((
+            ticker,
+            data.get('priority', 'LOW'),
+            w_sig.get('status', 'NONE'),
+            m_sig.get('status', 'NONE'),
+            w_sig.get('type') or m_sig.get('type') or 'NONE',
+            anchor_bar.get('RelVol', np.nan),
+            anchor_bar.get('CLV', np.nan),
+            data.get('quarterly_context', 'NEUTRAL'),
+            data.get('monthly_context', 'NEUTRAL'),
+            data.get('weekly_context', 'NEUTRAL'),
+            data.get('daily_confirmation', 'NONE'),
+        ))
+
+    table = pd.DataFrame.from_records(rows, columns=['ticker'] + columns).set_index('ticker')
+    if table.empty:
+        table['score'] = pd.Series(dtype='float64')
+        return table
+
+    is_bullish = table['w_type'].isin(BULLISH_ANCHORS)
+    direction = np.where(is_bullish, 1.0, -1.0)
+    expected_trend = np.where(is_bullish, "BULLISH_TREND", "BEARISH_TREND")
+
+    alignment = sum((table[col] == expected_trend).astype(float) for col in ['q_context', 'm_context', 'w_context'])
+
+    table['score'] = (
+        table['priority'].map(PRIORITY_WEIGHTS).fillna(0) * 2.0
+        + table['w_status'].map(STATUS_WEIGHTS).fillna(0) * 1.5
+        + table['m_status'].map(STATUS_WEIGHTS).fillna(0)
+        + (table['anchor_relvol'].fillna(0).clip(upper=4.0) - 1.8).clip(lower=0)
+        + table['anchor_clv'].fillna(0) * direction
+        + alignment * 0.5
+        + (table['daily_confirmation'] == "TEST_OBSERVED").astype(float) * 1.5
+    ).round(2)
+
+    return table.sort_values('score', ascending=False)
+
+# Rule-based levels: swing points over the last SWING_BARS bars, invalidation buffer = fraction of average spread
+SWING_BARS = 10
+SPREAD_BUFFER = 0.25
+LEVEL_FIELDS = ['entry_trigger', 'invalidation_level', 'key_levels', 'setup_stage', 'smart_money_logic']
+
+def derive_trade_levels(tickers_data):
+    """
+    Deterministic entry trigger, invalidation level, key levels and setup stage for filtered tickers,
+    computed in one vectorized table from the anchor and test bars of the weekly sequence (monthly if
+    there is no weekly one), recent swing points and a spread-based buffer.
+    Returns a DataFrame indexed by ticker with LEVEL_FIELDS (the fields analyze_batch asks the LLM for)
+    and 'invalidation_price', the numeric level in invalidation_level.
+    Tickers without a sequence or without bar data are left out.
+    """
+    columns = ['timeframe', 'type', 'status', 'anchor_date', 'tests', 'anchor_high', 'anchor_low',
+               'test_high', 'test_low', 'swing_high', 'swing_low', 'avg_spread', 'anchor_relvol']
+    rows = []
+    for ticker, data in tickers_data.items():
+        for timeframe in ('weekly', 'monthly'):
+            sig = data.get(f'{timeframe}_signal') or {}
+            bars = data.get(f'{timeframe}_data') or {}
+            anchor = bars.get(sig.get('anchor_date'))
+            if sig.get('signal') == 'DETECTED' and anchor:
+                break
+        else:
+            continue
+
+        tests = [bars[d] for d in (sig.get('test1_date'), sig.get('test2_date')) if d in bars]
+        recent = list(bars.values())[-SWING_BARS:]
+        rows.append((
+            ticker, timeframe, sig.get('type'), sig.get('status'), sig.get('anchor_date'), len(tests),
+            anchor['High'], anchor['Low'],
+            max((t['High'] for t in tests), default=np.nan),
+            min((t['Low'] for t in tests), default=np.nan),
+            max(b['High'] for b in recent),
+            min(b['Low'] for b in recent),
+            np.mean([b.get('Spread', b['High'] - b['Low']) for b in recent]),
+            anchor.get('RelVol', np.nan),
+        ))
+
+    table = pd.DataFrame.from_records(rows, columns=['ticker'] + columns).set_index('ticker')
+    if table.empty:
+        return pd.DataFrame(columns=LEVEL_FIELDS + ['invalidation_price'])
+
+    is_bullish = table['type'].isin(BULLISH_ANCHORS)
+    is_confirmed = table['status'].str.startswith('CONFIRMED')
+    buffer = table['avg_spread'] * SPREAD_BUFFER
+    # Structure low/high: the anchor bar extreme or a test that went beyond it
+    structure_low = table[['anchor_low', 'test_low']].min(axis=1)
+    structure_high = table[['anchor_high', 'test_high']].max(axis=1)
+
+    # Bullish: enter on a close above the last test (or the anchor) high, invalidated below the structure low.
+    # Bearish mirrors it: exit/short on a close below the test (or anchor) low, invalidated above the structure high.
+    trigger = np.where(is_bullish, table['test_high'].fillna(table['anchor_high']), table['test_low'].fillna(table['anchor_low']))
+    invalidation = np.where(is_bullish, structure_low - buffer, structure_high + buffer)
+    support = np.where(is_bullish, structure_low, table['swing_low'])
+    resistance = np.where(is_bullish, table['swing_high'], structure_high)
+
+    bar = table['timeframe'].str.capitalize()
+    above_below = pd.Series(np.where(is_bullish, " close above ", " close below "), index=table.index)
+    waiting = pd.Series(np.select(
+        [is_confirmed, is_bullish], ["", " after a low-volume test"], default=" after a no-demand bar"
+    ), index=table.index)
+
+    def fmt(values):
+        return pd.Series(values, index=table.index).map('{:.2f}'.format)
 
+    levels = pd.DataFrame(index=table.index)
+    levels['entry_trigger'] = bar + above_below + fmt(trigger) + waiting
+    levels['invalidation_level'] = bar + pd.Series(np.where(is_bullish, " close below ", " close above "), index=table.index) + fmt(invalidation)
+    levels['invalidation_price'] = np.round(invalidation, 2)
+    levels['key_levels'] = [list(pair) for pair in zip(fmt(support), fmt(resistance))]
+    levels['setup_stage'] = np.select(
+        [is_confirmed & is_bullish, is_confirmed & ~is_bullish],
+        ["Ready for Entry", "Ready for Exit"], default="Monitoring"
+    )
+    levels['smart_money_logic'] = (
+        bar + " " + table['type'] + " anchor on " + table['anchor_date']
+        + " (RelVol " + table['anchor_relvol'].map('{:.2f}'.format) + ") with "
+        + table['tests'].astype(str) + " confirming test(s). Rule-based levels (no LLM)."
+    )
+    return levels